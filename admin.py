@@ -0,0 +1,55 @@
+# =========================================================
+# ADMINISTRACIÓN (RECARGA E INGESTA DE DATOS)
+# =========================================================
+
+import hmac
+import os
+
+from fastapi import APIRouter, Body, Header, HTTPException
+
+import data_store
+
+router = APIRouter()
+
+# /admin/* exige el encabezado X-Admin-Token con este valor; sin
+# ADMIN_TOKEN definido los endpoints de administración quedan deshabilitados
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+
+def verificar_token(token):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Administración deshabilitada: defina ADMIN_TOKEN")
+    if token is None or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Token de administración inválido")
+
+
+@router.post("/recargar", status_code=202)
+def recargar(x_admin_token: str | None = Header(default=None)):
+    verificar_token(x_admin_token)
+
+    iniciada = data_store.recargar_en_segundo_plano()
+    return {
+        "recarga_iniciada": iniciada,
+        "mensaje": "Recarga en curso" if iniciada else "Ya hay una recarga en curso",
+        "version_datos": data_store.actual().version if data_store.listo() else None,
+    }
+
+
+@router.post("/ingerir")
+def ingerir(archivo: str = Body(..., embed=True), x_admin_token: str | None = Header(default=None)):
+    """Agrega un delta mensual ya copiado en datos/entrantes/ (solo el nombre del archivo)."""
+    verificar_token(x_admin_token)
+
+    ruta = (data_store.ENTRANTES_DIR / archivo).resolve()
+    if ruta.parent != data_store.ENTRANTES_DIR.resolve() or not ruta.is_file():
+        raise HTTPException(status_code=404, detail=f"No existe el delta '{archivo}' en {data_store.ENTRANTES_DIR.name}/")
+    if not data_store.listo():
+        raise HTTPException(status_code=503, detail="Los datos todavía se están cargando")
+
+    try:
+        resultado = data_store.ingerir(ruta)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if resultado is None:
+        raise HTTPException(status_code=409, detail="Ya hay una recarga en curso")
+    return resultado
@@ -0,0 +1,124 @@
+# =========================================================
+# CACHÉ HTTP CONDICIONAL (ETag / Last-Modified / 304)
+# =========================================================
+# Las respuestas de GET /consulta/* solo cambian cuando cambian los datos
+# (como mucho una vez al mes). Cada respuesta lleva:
+#
+#   ETag           hash de versión de datos + ruta + parámetros
+#   Last-Modified  momento en que se publicó esa versión de datos
+#   Cache-Control  configurable con CACHE_CONTROL
+#
+# Si el cliente (navegador o CDN) envía If-None-Match con el ETag vigente
+# (o If-Modified-Since sin If-None-Match) se responde 304 sin ejecutar la
+# consulta: el ETag se calcula solo con la versión, sin tocar pandas. Eso
+# vale para las Qxx, que siempre existen; en el resto (/departamento/{depto},
+# rutas desconocidas) el 304 se decide después de que la consulta responda
+# 200, para no confirmar con un 304 un recurso que sería 404.
+
+import hashlib
+import os
+import threading
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi.responses import Response
+
+import data_store
+
+PREFIJO = "/consulta"
+
+# GET bajo /consulta que no dependen solo de la versión de datos
+EXCLUIDAS = {PREFIJO + "/cache"}  # estadísticas en vivo de la caché de resultados
+
+# Por defecto el cliente guarda la respuesta pero revalida siempre: tras
+# una recarga nadie ve datos viejos y las repeticiones cuestan un 304
+CACHE_CONTROL = os.environ.get("CACHE_CONTROL", "public, max-age=0, must-revalidate")
+
+
+def etag(datos, request) -> str:
+    # Mismos parámetros en otro orden → misma respuesta → mismo ETag
+    parametros = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    clave = f"{datos.version}|{request.url.path}|{parametros}"
+    # Débil: la misma respuesta sirve con y sin gzip
+    return f'W/"{hashlib.sha256(clave.encode()).hexdigest()[:20]}"'
+
+
+# version_datos -> momento de su primera publicación (una recarga sin
+# cambios publica la misma versión y no la "modifica")
+_publicaciones = {}
+_lock = threading.Lock()
+
+
+def registrar_publicacion(datos):
+    with _lock:
+        momento = _publicaciones.get(datos.version) or datetime.now(timezone.utc).replace(microsecond=0)
+        _publicaciones.clear()
+        _publicaciones[datos.version] = momento
+
+
+def publicada_en(datos) -> datetime:
+    with _lock:
+        momento = _publicaciones.get(datos.version)
+    # Versión aún sin registrar (instante entre publicar y el hook): ahora
+    return momento or datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def no_modificado(request, etiqueta: str, momento: datetime) -> bool:
+    si_no_coincide = request.headers.get("if-none-match")
+    if si_no_coincide is not None:
+        # Comparación débil: W/"x" y "x" son la misma etiqueta
+        etiquetas = {e.strip().removeprefix("W/") for e in si_no_coincide.split(",")}
+        return "*" in etiquetas or etiqueta.removeprefix("W/") in etiquetas
+
+    si_modificado = request.headers.get("if-modified-since")
+    if si_modificado is not None:
+        try:
+            desde = parsedate_to_datetime(si_modificado)
+        except (TypeError, ValueError):
+            return False
+        return desde.tzinfo is not None and momento <= desde
+    return False
+
+
+def activar(app):
+    """Cabeceras de validación en GET /consulta/* y 304 (sin ejecutar la consulta en las Qxx)."""
+    from consultas_fijas import CONSULTAS
+
+    # Rutas que existen siempre que hay datos: 304 sin ejecutar la consulta
+    siempre_existen = {f"{PREFIJO}/{c}" for c in CONSULTAS}
+
+    data_store.al_publicar(registrar_publicacion)
+    if data_store.listo():
+        registrar_publicacion(data_store.actual())
+
+    @app.middleware("http")
+    async def cache_condicional(request, call_next):
+        ruta = request.url.path
+        if request.method not in ("GET", "HEAD") or not ruta.startswith(PREFIJO) \
+                or ruta in EXCLUIDAS or not data_store.listo():
+            return await call_next(request)
+
+        datos = data_store.actual()
+        momento = publicada_en(datos)
+        cabeceras = {
+            "ETag": etag(datos, request),
+            "Last-Modified": format_datetime(momento, usegmt=True),
+            "Cache-Control": CACHE_CONTROL,
+        }
+        existe = ruta in siempre_existen
+        if existe and no_modificado(request, cabeceras["ETag"], momento):
+            return Response(status_code=304, headers=cabeceras)
+
+        # La consulta se resuelve con la misma versión con la que se firmó
+        with data_store.fijar(datos):
+            respuesta = await call_next(request)
+        if respuesta.status_code != 200:
+            return respuesta
+
+        if not existe and no_modificado(request, cabeceras["ETag"], momento):
+            # El recurso existe: se descarta el cuerpo y se responde 304
+            async for _ in respuesta.body_iterator:
+                pass
+            return Response(status_code=304, headers=cabeceras)
+        respuesta.headers.update(cabeceras)
+        return respuesta
@@ -0,0 +1,85 @@
+# =========================================================
+# CACHÉ DE RESULTADOS DE CONSULTAS FIJAS
+# =========================================================
+# Las consultas Qxx son funciones puras de los datos cargados: el resultado
+# se guarda por (versión del dataset, endpoint, parámetros) en un LRU
+# acotado. Mientras se prepara una versión nueva conviven las dos; al
+# publicarla se descartan las entradas de las anteriores.
+
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+import data_store
+
+MAX_ENTRADAS = 256
+
+
+class CacheResultados:
+    def __init__(self, max_entradas: int = MAX_ENTRADAS):
+        self.max_entradas = max_entradas
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave, version):
+        clave = (version, clave)
+        with self._lock:
+            if clave in self._datos:
+                self._datos.move_to_end(clave)
+                self.aciertos += 1
+                return True, self._datos[clave]
+
+            self.fallos += 1
+            return False, None
+
+    def guardar(self, clave, version, valor):
+        clave = (version, clave)
+        with self._lock:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def limpiar(self, conservar=None):
+        """Borra todo salvo las entradas de la versión `conservar`."""
+        with self._lock:
+            for clave in [c for c in self._datos if c[0] != conservar]:
+                del self._datos[clave]
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "versiones": sorted({version for version, _ in self._datos}),
+                "entradas": len(self._datos),
+                "max_entradas": self.max_entradas,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else 0.0,
+            }
+
+
+CACHE = CacheResultados()
+
+# Con la versión nueva publicada, lo guardado de las anteriores ya no se pide
+data_store.al_publicar(lambda datos: CACHE.limpiar(conservar=datos.version))
+
+
+def cacheado(func):
+    """Decorador para endpoints: reutiliza el resultado mientras no cambien los datos."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        version = data_store.actual().version
+        clave = (func.__name__, args, tuple(sorted(kwargs.items())))
+
+        encontrado, valor = CACHE.obtener(clave, version)
+        if encontrado:
+            return valor
+
+        valor = func(*args, **kwargs)
+        CACHE.guardar(clave, version, valor)
+        return valor
+
+    return wrapper
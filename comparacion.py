@@ -0,0 +1,54 @@
+# =========================================================
+# COMPARACIÓN AÑO CONTRA AÑO (MISMO CORTE DE VERSIÓN)
+# =========================================================
+# Q03 y Q26–Q29 comparan el año de la última versión preliminar con el
+# anterior, al mismo MesVersion. comparar() obtiene ambos años en una sola
+# agrupación del cubo, para cualquier conjunto de dimensiones y filtros.
+
+import pandas as pd
+
+from cubo import REGISTROS, filtrar
+
+# Columnas del resultado
+ANTERIOR = "anterior"
+ACTUAL = "actual"
+VARIACION = "variacion"
+
+
+def tendencia(variacion: int) -> str:
+    return "aumentaron" if variacion > 0 else "disminuyeron" if variacion < 0 else "se mantuvieron"
+
+
+def comparar(
+    cubo: pd.DataFrame,
+    anio_actual: int,
+    mes: int,
+    columnas=(),
+    medida: str = REGISTROS,
+    dropna: bool = True,
+    **filtros,
+) -> pd.DataFrame:
+    """
+    Conteos de `anio_actual` y del año anterior en MesVersion == `mes`,
+    agrupados por `columnas`, con columnas anterior / actual / variacion.
+    Sin columnas devuelve una sola fila (índice "total").
+    """
+    anio_anterior = anio_actual - 1
+    columnas = [columnas] if isinstance(columnas, str) else list(columnas)
+
+    seleccion = filtrar(cubo, MesVersion=mes, AnoHecho=[anio_anterior, anio_actual], **filtros)
+
+    if columnas:
+        conteos = (
+            seleccion.groupby(columnas + ["AnoHecho"], observed=True, dropna=dropna)[medida]
+            .sum()
+            .unstack("AnoHecho", fill_value=0)
+        )
+    else:
+        conteos = seleccion.groupby("AnoHecho")[medida].sum().to_frame("total").T
+
+    conteos = conteos.reindex(columns=[anio_anterior, anio_actual], fill_value=0).fillna(0).astype(int)
+    conteos.columns = [ANTERIOR, ACTUAL]
+    conteos.columns.name = None
+    conteos[VARIACION] = conteos[ACTUAL] - conteos[ANTERIOR]
+    return conteos
@@ -0,0 +1,169 @@
+# =========================================================
+# CONSULTAS SQL AD-HOC (SOLO LECTURA, DUCKDB)
+# =========================================================
+# POST /consulta/sql ejecuta un SELECT con DuckDB sobre la instantánea de
+# datos publicada: mismas etiquetas canónicas y banderas que las Qxx, sin
+# volver a leer el archivo. DuckDB escanea los frames en sitio, con
+# proyección de columnas y en varios hilos.
+#
+# Restricciones: una sola sentencia SELECT, solo las tablas de TABLAS y
+# ninguna función de tabla (range, duckdb_settings, ...), sin acceso a
+# archivos ni cambios de configuración, a lo sumo SQL_MAX_FILAS filas,
+# SQL_TIEMPO_MAX_SEG segundos, SQL_MEMORIA_MAX de memoria y SQL_HILOS hilos.
+
+import json
+import os
+import threading
+
+from fastapi import APIRouter, Body, HTTPException
+
+from data_store import actual
+from respuestas import RespuestaJSON, RutaJSON
+
+router = APIRouter(route_class=RutaJSON)
+
+SQL_MAX_FILAS = int(os.environ.get("SQL_MAX_FILAS", "10000"))
+SQL_TIEMPO_MAX_SEG = float(os.environ.get("SQL_TIEMPO_MAX_SEG", "10"))
+# Un producto cruzado puede agotar la memoria antes del límite de tiempo
+SQL_MEMORIA_MAX = os.environ.get("SQL_MEMORIA_MAX", "512MB")
+SQL_HILOS = int(os.environ.get("SQL_HILOS", "2"))
+
+# Nombre de la tabla en SQL -> atributo de la instantánea (data_store.Datos)
+TABLAS = {
+    "vigente": "vigente",
+    "final": "final",
+    "preliminar": "preliminar",
+    "cubo_final": "cubo_final",
+    "cubo_preliminar": "cubo_preliminar",
+}
+
+
+def conectar(datos):
+    import duckdb
+
+    con = duckdb.connect(config={
+        "enable_external_access": False,
+        "memory_limit": SQL_MEMORIA_MAX,
+        "threads": SQL_HILOS,
+    })
+    for nombre, atributo in TABLAS.items():
+        con.register(nombre, getattr(datos, atributo))
+    con.execute("SET lock_configuration = true")
+    return con
+
+
+def referencias(arbol: dict) -> tuple[set, set]:
+    """
+    Tablas fuera de TABLAS y funciones de tabla del árbol de
+    json_serialize_sql. Un nombre de WITH vale como tabla solo donde es
+    visible: en su bloque y en los WITH que lo siguen (o en sí mismo).
+    """
+    tablas, funciones = set(), set()
+
+    def recorrer(nodo, ctes: frozenset):
+        if isinstance(nodo, list):
+            for valor in nodo:
+                recorrer(valor, ctes)
+            return
+        if not isinstance(nodo, dict):
+            return
+
+        if nodo.get("type") == "TABLE_FUNCTION":
+            funciones.add(nodo.get("function", {}).get("function_name", "?"))
+        elif nodo.get("type") == "BASE_TABLE":
+            # Con esquema o catálogo (information_schema.tables, pg_catalog...) nunca
+            nombre = nodo.get("table_name", "")
+            calificada = nodo.get("catalog_name") or nodo.get("schema_name")
+            if calificada or (nombre.lower() not in TABLAS and nombre.lower() not in ctes):
+                partes = (nodo.get("catalog_name"), nodo.get("schema_name"), nombre)
+                tablas.add(".".join(p for p in partes if p))
+
+        definidas = [c["key"].lower() for c in (nodo.get("cte_map") or {}).get("map", [])]
+        for i, cte in enumerate((nodo.get("cte_map") or {}).get("map", [])):
+            recorrer(cte.get("value"), ctes | set(definidas[:i + 1]))
+        for clave, valor in nodo.items():
+            if clave != "cte_map":
+                recorrer(valor, ctes | set(definidas))
+
+    recorrer(arbol, frozenset())
+    return tablas, funciones
+
+
+def validar(con, sql: str) -> str:
+    """Devuelve la sentencia sin ';' final o lanza 400."""
+    import duckdb
+
+    try:
+        sentencias = con.extract_statements(sql)
+    except duckdb.Error as e:
+        raise HTTPException(status_code=400, detail=f"SQL inválido: {e}")
+
+    if len(sentencias) != 1:
+        raise HTTPException(status_code=400, detail="Se admite una sola sentencia")
+    if sentencias[0].type != duckdb.StatementType.SELECT:
+        raise HTTPException(status_code=400, detail="Solo se admiten consultas SELECT")
+
+    consulta = sentencias[0].query.strip().rstrip(";")
+
+    # Tablas y funciones de tabla se buscan en el árbol sintáctico:
+    # get_table_names no ve las tablas registradas, las vistas del catálogo
+    # (information_schema, pg_catalog, sqlite_master) ni las funciones
+    arbol = json.loads(con.execute("SELECT json_serialize_sql(?)", [consulta]).fetchone()[0])
+    if arbol.get("error"):
+        raise HTTPException(status_code=400, detail=f"SQL inválido: {arbol.get('error_message')}")
+    tablas, funciones = map(sorted, referencias(arbol))
+    if tablas:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Tablas no permitidas: {', '.join(tablas)} (disponibles: {', '.join(TABLAS)})",
+        )
+    if funciones:
+        raise HTTPException(status_code=400, detail=f"Funciones de tabla no permitidas: {', '.join(funciones)}")
+    return consulta
+
+
+@router.post("/sql")
+def consulta_sql(sql: str = Body(..., embed=True), limite: int = Body(default=SQL_MAX_FILAS, embed=True)):
+    try:
+        import duckdb
+    except ImportError:
+        raise HTTPException(status_code=501, detail="DuckDB no está instalado")
+
+    datos = actual()
+    limite = max(0, min(limite, SQL_MAX_FILAS))
+
+    con = conectar(datos)
+    try:
+        consulta = validar(con, sql)
+
+        # Una fila de más para saber si el resultado se recortó
+        temporizador = threading.Timer(SQL_TIEMPO_MAX_SEG, con.interrupt)
+        temporizador.start()
+        try:
+            resultado = con.execute(f"SELECT * FROM ({consulta}) AS q LIMIT {limite + 1}")
+            filas = resultado.fetchall()
+            columnas = [c[0] for c in resultado.description]
+        except duckdb.InterruptException:
+            raise HTTPException(
+                status_code=408, detail=f"La consulta superó {SQL_TIEMPO_MAX_SEG:g} s"
+            )
+        except duckdb.Error as e:
+            raise HTTPException(status_code=400, detail=f"Error ejecutando la consulta: {e}")
+        finally:
+            temporizador.cancel()
+    finally:
+        con.close()
+
+    # Se serializa aquí: un tipo de DuckDB sin conversión a JSON es un 400
+    # con la forma de evitarlo, no un 500
+    try:
+        return RespuestaJSON({
+            "version_datos": datos.version,
+            "columnas": columnas,
+            "filas": filas[:limite],
+            "truncado": len(filas) > limite,
+        })
+    except TypeError as e:
+        raise HTTPException(
+            status_code=400, detail=f"{e}; conviértala en la consulta, ej: CAST(columna AS VARCHAR)"
+        )
@@ -1,9 +1,31 @@
-from fastapi import APIRouter
-from data_store import DF_VIGENTE
+import os
+
+from fastapi import APIRouter, Body, HTTPException
+from data_store import actual, fijar
+
+from cache_resultados import CACHE, cacheado
+from comparacion import ACTUAL, ANTERIOR, VARIACION, comparar, tendencia
+from cubo import FILAS, contar, por
+from diccionarios import normalizar
+from distintos import contar_distintos
+from procesos import en_proceso
+from respuestas import RutaJSON
 
 import pandas as pd
 
-router = APIRouter()
+# Los handlers devuelven Series / DataFrames / escalares NumPy tal cual;
+# RutaJSON los serializa con orjson (ver respuestas.py)
+router = APIRouter(route_class=RutaJSON)
+
+# Backend de las consultas que recorren filas de víctimas: "pandas" o
+# "polars" (ver consultas_polars.py); se elige al arrancar
+BACKEND = os.environ.get("CONSULTAS_BACKEND", "pandas")
+if BACKEND == "polars":
+    try:
+        import consultas_polars
+    except ImportError as e:
+        print("⚠️ Polars no disponible, las consultas usan pandas:", e)
+        BACKEND = "pandas"
 
 # =====================
 # UTILIDADES
@@ -16,31 +38,59 @@ def anios_ordenados(df):
     return sorted(df["AnoHecho"].dropna().astype(int).unique())
 
 
+def con_backend(func):
+    """Con el backend polars, usa la implementación de consultas_polars si existe."""
+    if BACKEND == "polars":
+        return getattr(consultas_polars, func.__name__, func)
+    return func
+
+
+@cacheado
+def variacion(columnas=(), **filtros):
+    """
+    Año de la última versión preliminar contra el anterior, al mismo
+    MesVersion (ver comparacion.py). Se guarda en la caché por versión de
+    datos: las consultas que comparten dimensiones reutilizan el resultado.
+    """
+    datos = actual()
+    return comparar(datos.cubo_preliminar, datos.anio_version, datos.mes_version, columnas, **filtros)
+
+
+def resumen_variacion(datos, fila):
+    return {
+        "anio_actual": datos.anio_version,
+        "anio_anterior": datos.anio_version - 1,
+        "mes": datos.mes_version,
+        "muertes_anterior": int(fila[ANTERIOR]),
+        "muertes_actual": int(fila[ACTUAL]),
+        "variacion": int(fila[VARIACION]),
+        "tendencia": tendencia(fila[VARIACION]),
+    }
+
+
 # =====================
 # Q01 – TOTAL ÚLTIMOS 3 AÑOS
 # =====================
 @router.get("/Q01")
+@cacheado
+@en_proceso
+@con_backend
 def q01():
-    df = DF_VIGENTE[DF_VIGENTE["VersionFinalActual"] == 1].copy()
+    datos = actual()
+    df = datos.final
 
     anios = anios_ordenados(df)[-3:]
     d = df[df["AnoHecho"].isin(anios)]
 
-    pivot = (
-        d.groupby(["AnoHecho", "EstadoVictima"])["NumeroRadicadoInforme"]
-         .nunique()
-         .unstack(fill_value=0)
-    )
-
-    respuesta = {}
-    for a in anios:
-        respuesta[str(a)] = {
-            "Lesionados": int(pivot.loc[a].get("lesionados", 0)),
-            "Muertos": int(pivot.loc[a].get("muertos", 0)),
-            "Total": int(pivot.loc[a].sum())
-        }
+    # Incidentes distintos (NumeroRadicadoInforme) por año y estado
+    pivot = contar_distintos(d, ["AnoHecho", "EstadoVictima"]).unstack(fill_value=0)
 
-    return respuesta
+    # Una columna por año: {"2024": {"Lesionados": .., "Muertos": .., "Total": ..}}
+    return pd.DataFrame({
+        "Lesionados": pivot.get("lesionados", 0),
+        "Muertos": pivot.get("muertos", 0),
+        "Total": pivot.sum(axis=1),
+    }).T
 
 
 
@@ -49,80 +99,64 @@ def q01():
 # Q02 – ESTADO ÚLTIMO AÑO
 # =====================
 @router.get("/Q02")
+@cacheado
 def q02():
-    a = ultimo_anio(DF_VIGENTE)
+    datos = actual()
+    a = datos.anio_actual
 
     # FILTRO BASE: último año + versión vigente
-    d = DF_VIGENTE[
-        (DF_VIGENTE["AnoHecho"] == a) &
-        (DF_VIGENTE["VersionFinalActual"] == 1)
-    ]
-
-    # Normalizar EstadoVictima
-    d["EstadoVictima"] = d["EstadoVictima"].str.strip().str.lower()
+    cubo = datos.cubo_final
 
     return {
         "anio": a,
-        "total": int(d.shape[0]),
-        "muertos": int(d[d["EstadoVictima"] == "muertos"].shape[0]),
-        "lesionados": int(d[d["EstadoVictima"] == "lesionados"].shape[0]),
+        "total": contar(cubo, FILAS, AnoHecho=a),
+        "muertos": contar(cubo, FILAS, AnoHecho=a, EstadoVictima="muertos"),
+        "lesionados": contar(cubo, FILAS, AnoHecho=a, EstadoVictima="lesionados"),
     }
 
 # =====================
 # Q03 – COMPARACIÓN DOS AÑOS
 # =====================
 @router.get("/Q03")
+@cacheado
 def q03():
-    df = DF_VIGENTE[DF_VIGENTE["EsVersionFinal"] == 0].copy()
-
-    ultima_fecha = pd.to_datetime(df["FechaVersion"], errors="coerce").max()
-    mes_version = int(ultima_fecha.month)
-    anio_actual = int(ultima_fecha.year)
-    anio_anterior = anio_actual - 1
+    datos = actual()
+    por_estado = variacion(("EstadoVictima",))
 
-    df_actual = df[(df["AnoHecho"] == anio_actual) & (df["MesVersion"] == mes_version)]
-    df_anterior = df[(df["AnoHecho"] == anio_anterior) & (df["MesVersion"] == mes_version)]
-
-    df_actual["EstadoVictima"] = df_actual["EstadoVictima"].str.strip().str.lower()
-    df_anterior["EstadoVictima"] = df_anterior["EstadoVictima"].str.strip().str.lower()
-
-    def contar(d, estado):
-        return int(d[d["EstadoVictima"] == estado]["NumeroRadicadoInforme"].count())
+    def valor(estado, columna):
+        return int(por_estado[columna].get(estado, 0))
 
     return {
-        "anio_anterior": anio_anterior,
-        "anio_actual": anio_actual,
-        "mes_version": mes_version,
-        "muertos_anterior": contar(df_anterior, "muertos"),
-        "lesionados_anterior": contar(df_anterior, "lesionados"),
-        "muertos_actual": contar(df_actual, "muertos"),
-        "lesionados_actual": contar(df_actual, "lesionados"),
+        "anio_anterior": datos.anio_version - 1,
+        "anio_actual": datos.anio_version,
+        "mes_version": datos.mes_version,
+        "muertos_anterior": valor("muertos", ANTERIOR),
+        "lesionados_anterior": valor("lesionados", ANTERIOR),
+        "muertos_actual": valor("muertos", ACTUAL),
+        "lesionados_actual": valor("lesionados", ACTUAL),
     }
 
-
-
-
 # =====================
 # Q04 – RESUMEN NACIONAL
 # =====================
 @router.get("/Q04")
+@cacheado
 def q04():
-    df = DF_VIGENTE[DF_VIGENTE["VersionFinalActual"] == 1].copy()
+    datos = actual()
+    cubo = datos.cubo_final
 
-    anio_actual = int(df["AnoHecho"].max())
-    d = df[df["AnoHecho"] == anio_actual]
+    anio_actual = datos.anio_final
 
     # Totales
-    total = int(d["NumeroRadicadoInforme"].count())
-    muertos = int(d[d["EstadoVictima"].str.strip().str.lower() == "muertos"]["NumeroRadicadoInforme"].count())
-    lesionados = int(d[d["EstadoVictima"].str.strip().str.lower() == "lesionados"]["NumeroRadicadoInforme"].count())
+    total = contar(cubo, AnoHecho=anio_actual)
+    muertos = contar(cubo, AnoHecho=anio_actual, EstadoVictima="muertos")
+    lesionados = contar(cubo, AnoHecho=anio_actual, EstadoVictima="lesionados")
 
     # Detalle por ActorVial
     detalle = (
-        d.groupby(["EstadoVictima", "ActorVial"])["NumeroRadicadoInforme"]
-        .count()
+        por(cubo, ["EstadoVictima", "ActorVial"], AnoHecho=anio_actual)
         .unstack(fill_value=0)
-        .to_dict()
+        .rename(columns=datos.etiquetar("ActorVial"))
     )
 
     return {
@@ -133,237 +167,189 @@ def q04():
         "detalle_actor_vial": detalle
     }
 
-
 # =====================
 # Q05 – ANTIOQUIA
 # =====================
 @router.get("/Q05")
+@cacheado
 def q05():
-    df = DF_VIGENTE[DF_VIGENTE["VersionFinalActual"] == 1].copy()
-    anio_actual = int(df["AnoHecho"].max())
+    datos = actual()
+    cubo = datos.cubo_final
+    anio_actual = datos.anio_final
 
-    d = df[
-        (df["AnoHecho"] == anio_actual) &
-        (df["Departamento"] == "antioquia")
-    ]
+    filtro = {"AnoHecho": anio_actual, "Departamento": "antioquia"}
 
-    total = int(d["NumeroRadicadoInforme"].count())
-    muertos = int(d[d["EstadoVictima"].str.strip().str.lower() == "muertos"]["NumeroRadicadoInforme"].count())
-    lesionados = int(d[d["EstadoVictima"].str.strip().str.lower() == "lesionados"]["NumeroRadicadoInforme"].count())
+    total = contar(cubo, **filtro)
+    muertos = contar(cubo, **filtro, EstadoVictima="muertos")
+    lesionados = contar(cubo, **filtro, EstadoVictima="lesionados")
 
     return {
         "anio": anio_actual,
-        "departamento": "ANTIOQUIA",
+        "departamento": datos.etiquetar("Departamento")("antioquia"),
         "total": total,
         "muertos": muertos,
         "lesionados": lesionados,
     }
 
-
-
 # =====================
 # Q06 – DEPTO CON MÁS VÍCTIMAS
 # =====================
 @router.get("/Q06")
+@cacheado
 def q06():
-    df = DF_VIGENTE[DF_VIGENTE["VersionFinalActual"] == 1].copy()
-    anio_actual = int(df["AnoHecho"].max())
+    datos = actual()
+    anio_actual = datos.anio_final
 
     top5 = (
-        df[df["AnoHecho"] == anio_actual]
-        .groupby("Departamento")["NumeroRadicadoInforme"]
-        .count()
+        por(datos.cubo_final, "Departamento", AnoHecho=anio_actual)
         .sort_values(ascending=False)
         .head(5)
+        .rename(datos.etiquetar("Departamento"))
     )
 
     return {
         "anio": anio_actual,
-        "top5": top5.astype(int).to_dict()
+        "top5": top5
     }
 
-
-
 # =====================
 # Q07 – MUERTOS MEDELLÍN
 # =====================
 @router.get("/Q07")
+@cacheado
 def q07():
-    df = DF_VIGENTE[DF_VIGENTE["VersionFinalActual"] == 1].copy()
-    anio_actual = int(df["AnoHecho"].max())
-
-    t = df[
-        (df["AnoHecho"] == anio_actual) &
-        (df["Municipio"] == "medellin") &
-        (df["EstadoVictima"].str.strip().str.lower() == "muertos")
-    ]["NumeroRadicadoInforme"].count()
+    datos = actual()
+    anio_actual = datos.anio_final
+
+    t = contar(
+        datos.cubo_final,
+        AnoHecho=anio_actual,
+        Municipio="medellin",
+        EstadoVictima="muertos",
+    )
 
     return {
         "anio": anio_actual,
-        "municipio": "MEDELLIN",
-        "muertos": int(t)
+        "municipio": datos.etiquetar("Municipio")("medellin"),
+        "muertos": t
     }
 
-
-
 # =====================
 # Q08 – TOP 10 MUNICIPIOS
 # =====================
 @router.get("/Q08")
+@cacheado
 def q08():
-    df = DF_VIGENTE[DF_VIGENTE["VersionFinalActual"] == 1].copy()
-    anio_actual = int(df["AnoHecho"].max())
+    datos = actual()
+    anio_actual = datos.anio_final
 
     top = (
-        df[
-            (df["AnoHecho"] == anio_actual) &
-            (df["EstadoVictima"].str.strip().str.lower() == "muertos")
-        ]
-        .groupby("Municipio")["NumeroRadicadoInforme"]
-        .count()
+        por(datos.cubo_final, "Municipio", AnoHecho=anio_actual, EstadoVictima="muertos")
         .sort_values(ascending=False)
         .head(10)
+        .rename(datos.etiquetar("Municipio"))
     )
 
     return {
         "anio": anio_actual,
-        "data": top.astype(int).to_dict()
+        "data": top
     }
 
-
-
 # =====================
 # Q09 – URBANO VS RURAL
 # =====================
 @router.get("/Q09")
+@cacheado
 def q09():
-    df = DF_VIGENTE[DF_VIGENTE["VersionFinalActual"] == 1].copy()
-    anio_actual = int(df["AnoHecho"].max())
+    datos = actual()
+    anio_actual = datos.anio_final
 
-    g = (
-        df[df["AnoHecho"] == anio_actual]
-        .groupby("Zona")["NumeroRadicadoInforme"]
-        .count()
-    )
+    g = por(datos.cubo_final, "Zona", AnoHecho=anio_actual)
 
     return {
         "anio": anio_actual,
-        "URBANA": int(g.get("urbana", 0)),
-        "RURAL": int(g.get("rural", 0)),
+        "URBANA": g.get("urbana", 0),
+        "RURAL": g.get("rural", 0),
     }
 
-
-
 # =====================
 # Q10 – MES CON MÁS SINIESTROS
 # =====================
 @router.get("/Q10")
+@cacheado
 def q10():
-    df = DF_VIGENTE[DF_VIGENTE["VersionFinalActual"] == 1].copy()
-
-    anio_actual = int(df["AnoHecho"].max())
-    d = df[df["AnoHecho"] == anio_actual].copy()
-
-    # Normalizar EstadoVictima
-    d["EstadoVictima"] = d["EstadoVictima"].str.strip().str.lower()
-
-    # Total por mes (sin distinguir muertos/lesionados)
-    total_mes = (
-        d.groupby("MesHecho")["NumeroRadicadoInforme"]
-        .count()
-        .sort_index()
-    )
+    datos = actual()
+    cubo = datos.cubo_final
 
-    # Muertos por mes
-    muertos_mes = (
-        d[d["EstadoVictima"] == "muertos"]
-        .groupby("MesHecho")["NumeroRadicadoInforme"]
-        .count()
-        .reindex(range(1, 13), fill_value=0)
-    )
-
-    # Lesionados por mes
-    lesionados_mes = (
-        d[d["EstadoVictima"] == "lesionados"]
-        .groupby("MesHecho")["NumeroRadicadoInforme"]
-        .count()
-        .reindex(range(1, 13), fill_value=0)
-    )
+    anio_actual = datos.anio_final
 
-    # Armar salida en el formato deseado
-    resultado = {}
-    for mes in range(1, 13):
-        resultado[mes] = {
-            "total": int(total_mes.get(mes, 0)),
-            "muertos": int(muertos_mes.get(mes, 0)),
-            "lesionados": int(lesionados_mes.get(mes, 0))
-        }
+    # Total por mes (sin distinguir muertos/lesionados), muertos y lesionados
+    meses = pd.DataFrame({
+        "total": por(cubo, "MesHecho", AnoHecho=anio_actual),
+        "muertos": por(cubo, "MesHecho", AnoHecho=anio_actual, EstadoVictima="muertos"),
+        "lesionados": por(cubo, "MesHecho", AnoHecho=anio_actual, EstadoVictima="lesionados"),
+    }).reindex(range(1, 13), fill_value=0).fillna(0).astype(int)
 
+    # Una columna por mes: {1: {"total": .., "muertos": .., "lesionados": ..}}
     return {
         "anio": anio_actual,
-        "meses": resultado
+        "meses": meses.T
     }
 
-
-
-
-
 # =====================
 # Q11 – MES CON MENOS SINIESTROS
 # =====================
 @router.get("/Q11")
+@cacheado
 def q11():
-    df = DF_VIGENTE[DF_VIGENTE["VersionFinalActual"] == 1].copy()
-    anio_actual = int(df["AnoHecho"].max())
+    datos = actual()
+    anio_actual = datos.anio_final
 
-    d = df[df["AnoHecho"] == anio_actual]
+    conteo = por(datos.cubo_final, "MesHecho", AnoHecho=anio_actual)
 
-    conteo = d.groupby("MesHecho")["NumeroRadicadoInforme"].count()
-
-    top3 = conteo.nsmallest(3).sort_values().astype(int)
+    top3 = conteo.nsmallest(3).sort_values()
 
     return {
         "anio": anio_actual,
-        "top3_meses_menos": top3.to_dict()
+        "top3_meses_menos": top3
     }
 
-
-
 # =====================
 # Q12 – HORA CON MÁS SINIESTROS
 # =====================
 @router.get("/Q12")
+@cacheado
 def q12():
-    df = DF_VIGENTE[DF_VIGENTE["VersionFinalActual"] == 1].copy()
-    anio_actual = int(df["AnoHecho"].max())
-
-    d = df[df["AnoHecho"] == anio_actual]
+    datos = actual()
+    anio_actual = datos.anio_final
 
-    conteo = d.groupby("Rango3horas")["NumeroRadicadoInforme"].count().sort_index()
+    conteo = por(datos.cubo_final, "Rango3horas", AnoHecho=anio_actual).sort_index()
 
     return {
         "anio": anio_actual,
-        "rangos": conteo.astype(int).to_dict()
+        "rangos": conteo
     }
 
-
-
 # =====================
 # Q13 – DÍA CON MÁS SINIESTROS
 # =====================
 @router.get("/Q13")
+@cacheado
+@en_proceso
+@con_backend
 def q13():
-    df = DF_VIGENTE[DF_VIGENTE["VersionFinalActual"] == 1].copy()
-    anio_actual = int(df["AnoHecho"].max())
+    datos = actual()
+    df = datos.final
+    anio_actual = datos.anio_final
 
-    d = df[df["AnoHecho"] == anio_actual].copy()
-    d["EstadoVictima"] = d["EstadoVictima"].str.strip().str.lower()
+    d = df[df["AnoHecho"] == anio_actual]
 
     conteo = (
-        d.groupby(["DiaOcurrencia", "EstadoVictima"])["NumeroRadicadoInforme"]
+        d.groupby(["DiaOcurrencia", "EstadoVictima"], observed=True)["NumeroRadicadoInforme"]
         .count()
         .unstack(fill_value=0)
     )
+    conteo.columns = conteo.columns.astype(str)
 
     # asegurar columnas
     for col in ["muertos", "lesionados"]:
@@ -374,80 +360,48 @@ def q13():
 
     return {
         "anio": anio_actual,
-        "dias": conteo[["total", "muertos", "lesionados"]]
-                .astype(int)
-                .to_dict(orient="index")
+        "dias": conteo[["total", "muertos", "lesionados"]].T
     }
 
 
 
-# =====================
-# FESTIVOS 2025-2026 (puedes extender)
-# =====================
-FESTIVOS = {
-    2025: [
-        '2025-01-01', '2025-03-03', '2025-04-17', '2025-04-18',
-        '2025-05-01', '2025-05-26', '2025-06-16', '2025-06-23',
-        '2025-07-20', '2025-08-07', '2025-08-18', '2025-10-13',
-        '2025-11-03', '2025-11-10', '2025-12-08', '2025-12-25'
-    ],
-    2026: [
-        '2026-01-01', '2026-03-16', '2026-03-26', '2026-03-27',
-        '2026-05-01', '2026-05-18', '2026-06-08', '2026-06-15',
-        '2026-07-20', '2026-08-07', '2026-08-17', '2026-10-12',
-        '2026-11-02', '2026-11-09', '2026-12-08', '2026-12-25'
-    ]
-}
-
-def es_festivo(fecha):
-    """Recibe datetime.date o datetime.datetime"""
-    f_str = fecha.strftime("%Y-%m-%d")
-    ano = fecha.year
-    return f_str in FESTIVOS.get(ano, [])
-
-def es_fin_de_semana(fecha):
-    return fecha.weekday() >= 5  # 5=sábado,6=domingo
-
-def es_festivo_o_findes(fecha):
-    return es_festivo(fecha) or es_fin_de_semana(fecha)
-
 # =====================
 # Q14 – FESTIVOS VS NO FESTIVOS
 # =====================
 @router.get("/Q14")
+@cacheado
+@en_proceso
+@con_backend
 def q14():
-    df = DF_VIGENTE[DF_VIGENTE["VersionFinalActual"] == 1].copy()
+    datos = actual()
+    df = datos.final
 
-    a = ultimo_anio(df)
-    d = df[df["AnoHecho"] == a].copy()
-
-    d["FechaHecho"] = pd.to_datetime(d["FechaHecho"], errors="coerce")
+    a = datos.anio_final
+    d = df[df["AnoHecho"] == a]
 
-    festivos_count = d["FechaHecho"].apply(lambda x: es_festivo_o_findes(x)).sum()
+    # Banderas precalculadas al cargar (ver festivos.py)
+    festivos_count = (d["EsFestivo"] | d["EsFinDeSemana"]).sum()
     total = len(d)
 
     return {
         "anio": a,
-        "FESTIVO_O_FINDES": int(festivos_count),
-        "DIA_HABIL": int(total - festivos_count)
+        "FESTIVO_O_FINDES": festivos_count,
+        "DIA_HABIL": total - festivos_count
     }
 # =====================
 # Q15 – ACTOR VIAL MÁS AFECTADO
 # =====================
 @router.get("/Q15")
+@cacheado
 def q15():
-    df = DF_VIGENTE[DF_VIGENTE["VersionFinalActual"] == 1].copy()
-
-    a = ultimo_anio(df)
-    d = df[df["AnoHecho"] == a]
+    datos = actual()
+    a = datos.anio_final
 
     top5 = (
-        d.groupby("ActorVial")["NumeroRadicadoInforme"]
-        .count()
+        por(datos.cubo_final, "ActorVial", AnoHecho=a)
         .sort_values(ascending=False)
         .head(5)
-        .astype(int)
-        .to_dict()
+        .rename(datos.etiquetar("ActorVial"))
     )
 
     return {
@@ -455,80 +409,64 @@ def q15():
         "top5": top5
     }
 
-
-
 # =====================
 # Q16 – Cantidad de moticiclistas muertos en el ultimo año
 # =====================
 @router.get("/Q16")
+@cacheado
 def q16():
-    df = DF_VIGENTE[DF_VIGENTE["VersionFinalActual"] == 1].copy()
-
-    a = ultimo_anio(df)
-    d = df[df["AnoHecho"] == a].copy()
-
-    d["EstadoVictima"] = d["EstadoVictima"].astype(str).str.strip().str.upper()
-    d["TipoVehiculo"] = d["TipoVehiculo"].astype(str).str.strip().str.upper()
-
-    t = d[
-        (d["TipoVehiculo"] == "MOTOCICLETA") &
-        (d["EstadoVictima"] == "MUERTOS")
-    ].shape[0]
-
-    return {"anio": a, "muertes_motocicletas": int(t)}
-
+    datos = actual()
+    a = datos.anio_final
+
+    t = contar(
+        datos.cubo_final, FILAS,
+        AnoHecho=a,
+        TipoVehiculo="motocicleta",
+        EstadoVictima="muertos",
+    )
 
+    return {"anio": a, "muertes_motocicletas": t}
 
 # =====================
 # Q17 – peatones muertos 2024
 # =====================
 @router.get("/Q17")
+@cacheado
 def q17():
-    df = DF_VIGENTE[DF_VIGENTE["VersionFinalActual"] == 1].copy()
-
-    d = df.copy()
-    d["EstadoVictima"] = d["EstadoVictima"].astype(str).str.strip().str.upper()
-    d["ActorVial"] = d["ActorVial"].astype(str).str.strip().str.upper()
-
-    t = d[
-        (d["AnoHecho"] == 2024) &
-        (d["ActorVial"] == "PEATÓN") &
-        (d["EstadoVictima"] == "MUERTOS")
-    ].shape[0]
+    datos = actual()
 
-    return {"anio": 2024, "muertes_peatones": int(t)}
+    t = contar(
+        datos.cubo_final, FILAS,
+        AnoHecho=2024,
+        ActorVial="peaton",
+        EstadoVictima="muertos",
+    )
 
+    return {"anio": 2024, "muertes_peatones": t}
 
 # =====================
 # Q18 – Cvehiculos mas muertos 3 años
 # =====================
 @router.get("/Q18")
+@cacheado
 def q18():
-    df = DF_VIGENTE[DF_VIGENTE["VersionFinalActual"] == 1].copy()
+    datos = actual()
+    cubo = datos.cubo_final
 
-    años = sorted(df["AnoHecho"].dropna().astype(int).unique())[-3:]
+    años = anios_ordenados(cubo)[-3:]
     años = [int(a) for a in años]
 
     resultado = {}
 
     for a in años:
-        d = df[df["AnoHecho"] == a].copy()
-
-        d["EstadoVictima"] = d["EstadoVictima"].astype(str).str.strip().str.upper()
-        d["TipoVehiculo"] = d["TipoVehiculo"].astype(str).str.strip().str.upper()
-
-        muertos = d[d["EstadoVictima"] == "MUERTOS"]
-
         top5 = (
-            muertos.groupby("TipoVehiculo")["NumeroRadicadoInforme"]
-            .count()
+            por(cubo, "TipoVehiculo", AnoHecho=a, EstadoVictima="muertos")
             .sort_values(ascending=False)
             .head(5)
-            .astype(int)
-            .to_dict()
+            .rename(datos.etiquetar("TipoVehiculo"))
         )
 
-        total = int(muertos.shape[0])
+        total = contar(cubo, FILAS, AnoHecho=a, EstadoVictima="muertos")
 
         resultado[str(a)] = {
             "total_muertes": total,
@@ -537,44 +475,36 @@ def q18():
 
     return {"anios": años, "data": resultado}
 
+
     # =====================
 # Q19 – Muertos ultim año
 # =====================
 @router.get("/Q19")
+@cacheado
 def q19():
-    df = DF_VIGENTE[DF_VIGENTE["VersionFinalActual"] == 1].copy()
-    a = ultimo_anio(df)
-
-    d = df[df["AnoHecho"] == a].copy()
-    d["Sexo"] = d["Sexo"].astype(str).str.strip().str.upper()
-    d["EstadoVictima"] = d["EstadoVictima"].astype(str).str.strip().str.lower()
-
-    muertos = d[d["EstadoVictima"].str.contains("muert")]
-
-    g = muertos.groupby("Sexo")["NumeroRadicadoInforme"].count().astype(int)
-
-    return {"anio": a, "data": g.to_dict()}
+    datos = actual()
+    cubo = datos.cubo_final
+    a = datos.anio_final
 
+    estados_muerte = [e for e in cubo["EstadoVictima"].cat.categories if "muert" in e]
 
+    g = por(cubo, "Sexo", AnoHecho=a, EstadoVictima=estados_muerte).rename(datos.etiquetar("Sexo"))
 
+    return {"anio": a, "data": g}
 
 # =====================
 # Q20 – TOP RANGOS EDAD
 # =====================
 @router.get("/Q20")
+@cacheado
 def q20():
-    df = DF_VIGENTE[DF_VIGENTE["VersionFinalActual"] == 1].copy()
-    a = ultimo_anio(df)
-
-    d = df[df["AnoHecho"] == a].copy()
+    datos = actual()
+    a = datos.anio_final
 
     g = (
-        d.groupby("RangoEdad")["NumeroRadicadoInforme"]
-        .count()
+        por(datos.cubo_final, "RangoEdad", AnoHecho=a)
         .sort_values(ascending=False)
         .head(3)
-        .astype(int)
-        .to_dict()
     )
 
     return {"anio": a, "data": g}
@@ -583,67 +513,47 @@ def q20():
 # Q21 – EDAD + SEXO
 # =====================
 @router.get("/Q21")
+@cacheado
 def q21():
     # Filtrar versiones finales
-    df = DF_VIGENTE[DF_VIGENTE["VersionFinalActual"] == 1].copy()
+    datos = actual()
 
     # Último año con datos
-    a = ultimo_anio(df)
+    a = datos.anio_final
 
-    # Filtrar por año
-    d = df[df["AnoHecho"] == a].copy()
-
-    # Normalizar EstadoVictima
-    d["EstadoVictima"] = d["EstadoVictima"].astype(str).str.strip().str.lower()
-
-    # Solo muertos
-    muertos = d[d["EstadoVictima"] == "muertos"]
-
-    # Top 3 por ClaseAccidente
+    # Top 3 por ClaseAccidente (solo muertos)
     top3 = (
-        muertos.groupby("ClaseAccidente")["NumeroRadicadoInforme"]
-        .count()
+        por(datos.cubo_final, "ClaseAccidente", AnoHecho=a, EstadoVictima="muertos")
         .sort_values(ascending=False)
         .head(3)
     )
 
     return {
         "anio": a,
-        "top3": [
-            {"clase": str(idx), "muertos": int(val)}
-            for idx, val in top3.items()
-        ]
+        "top3": top3.rename_axis("clase").reset_index(name="muertos").to_dict(orient="records")
     }
 
 # =====================
 # Q22 – Objeto de colision
 # =====================
 @router.get("/Q22")
+@cacheado
 def q22():
-    df = DF_VIGENTE[DF_VIGENTE["VersionFinalActual"] == 1].copy()
-
-    # Normalizar EstadoVictima
-    df["EstadoVictima"] = df["EstadoVictima"].astype(str).str.strip().str.lower()
+    datos = actual()
+    cubo = datos.cubo_final
 
-    # FILTRAR SOLO LOS CASOS CON MUERTOS
-    df = df[df["EstadoVictima"] == "muertos"]
-
-    a = ultimo_anio(df)
-    d = df[df["AnoHecho"] == a]
+    # SOLO LOS CASOS CON MUERTOS
+    a = ultimo_anio(cubo[cubo["EstadoVictima"] == "muertos"])
 
     top3 = (
-        d.groupby("ClaseAccidente")["NumeroRadicadoInforme"]
-         .count()
+        por(cubo, "ClaseAccidente", AnoHecho=a, EstadoVictima="muertos")
          .sort_values(ascending=False)
          .head(3)
     )
 
     return {
         "anio": a,
-        "top3": [
-            {"clase_accidente": str(idx), "cantidad": int(val)}
-            for idx, val in top3.items()
-        ]
+        "top3": top3.rename_axis("clase_accidente").reset_index(name="cantidad").to_dict(orient="records")
     }
 
 
@@ -651,14 +561,18 @@ def q22():
 # Q23 – OBJETO COLISIÓN
 # =====================
 @router.get("/Q23")
+@cacheado
+@en_proceso
+@con_backend
 def q23():
-    df = DF_VIGENTE[DF_VIGENTE["VersionFinalActual"] == 1].copy()
+    datos = actual()
+    df = datos.final
 
-    a = ultimo_anio(df)
-    d = df[df["AnoHecho"] == a].copy()
+    a = datos.anio_final
+    d = df[df["AnoHecho"] == a]
 
     top1 = (
-        d.groupby("ObjetoColision")["NumeroRadicadoInforme"]
+        d.groupby("ObjetoColision", observed=True)["NumeroRadicadoInforme"]
          .count()
          .sort_values(ascending=False)
          .head(1)
@@ -667,13 +581,10 @@ def q23():
     if top1.empty:
         return {"anio": a, "objeto_colision": None, "cantidad": 0}
 
-    idx = top1.index[0]
-    val = int(top1.iloc[0])
-
     return {
         "anio": a,
-        "objeto_colision": str(idx),
-        "cantidad": val
+        "objeto_colision": top1.index[0],
+        "cantidad": top1.iloc[0]
     }
 
 
@@ -681,21 +592,22 @@ def q23():
 # Q24 – HIPÓTESIS MÁS COMÚN
 # =====================
 @router.get("/Q24")
+@cacheado
+@en_proceso
+@con_backend
 def q24():
-    df = DF_VIGENTE[DF_VIGENTE["VersionFinalActual"] == 1].copy()
-
-    # Normalizar EstadoVictima
-    df["EstadoVictima"] = df["EstadoVictima"].astype(str).str.strip().str.lower()
+    datos = actual()
+    df = datos.final
 
     # Filtrar solo muertos
     df = df[df["EstadoVictima"] == "muertos"]
 
     # Último año con datos
     a = ultimo_anio(df)
-    d = df[df["AnoHecho"] == a].copy()
+    d = df[df["AnoHecho"] == a]
 
     top5 = (
-        d.groupby("Hipotesis")["NumeroRadicadoInforme"]
+        d.groupby("Hipotesis", observed=True)["NumeroRadicadoInforme"]
          .count()
          .sort_values(ascending=False)
          .head(5)
@@ -703,31 +615,29 @@ def q24():
 
     return {
         "anio": a,
-        "top5": [
-            {"hipotesis": str(idx), "cantidad": int(val)}
-            for idx, val in top5.items()
-        ]
+        "top5": top5.rename_axis("hipotesis").reset_index(name="cantidad").to_dict(orient="records")
     }
 
 # =====================
 # Q25 – CAUSA MUERTE
 # =====================
 @router.get("/Q25")
+@cacheado
+@en_proceso
+@con_backend
 def q25():
-    df = DF_VIGENTE[DF_VIGENTE["VersionFinalActual"] == 1].copy()
-
-    # Normalizar EstadoVictima
-    df["EstadoVictima"] = df["EstadoVictima"].astype(str).str.strip().str.lower()
+    datos = actual()
+    df = datos.final
 
     # Filtrar solo muertos
     df = df[df["EstadoVictima"] == "muertos"]
 
     # Último año con datos
     a = ultimo_anio(df)
-    d = df[df["AnoHecho"] == a].copy()
+    d = df[df["AnoHecho"] == a]
 
     top5 = (
-        d.groupby("CausaMuerte")["NumeroRadicadoInforme"]
+        d.groupby("CausaMuerte", observed=True)["NumeroRadicadoInforme"]
          .count()
          .sort_values(ascending=False)
          .head(5)
@@ -735,194 +645,58 @@ def q25():
 
     return {
         "anio": a,
-        "top5": [
-            {"causa_muerte": str(idx), "cantidad": int(val)}
-            for idx, val in top5.items()
-        ]
+        "top5": top5.rename_axis("causa_muerte").reset_index(name="cantidad").to_dict(orient="records")
     }
 
 # =====================
 # Q26 – VARIACIÓN ANTIOQUIA
 # =====================
 @router.get("/Q26")
+@cacheado
 def q26():
-    df = DF_VIGENTE[DF_VIGENTE["EsVersionFinal"] == 0].copy()
-
-    # obtener último mes disponible
-    ultima_fecha = pd.to_datetime(df["FechaVersion"], errors="coerce").max()
-    mes_actual = int(ultima_fecha.month)
-    anio_actual = int(ultima_fecha.year)
-    anio_anterior = anio_actual - 1
-
-    # normalizar columnas
-    df["EstadoVictima"] = df["EstadoVictima"].astype(str).str.strip().str.lower()
-    df["Departamento"] = df["Departamento"].astype(str).str.strip().str.lower()
-
-    # filtrar Antioquia + muertos + mes y año
-    df_actual = df[
-        (df["Departamento"] == "antioquia") &
-        (df["EstadoVictima"] == "muertos") &
-        (df["AnoHecho"] == anio_actual) &
-        (df["MesVersion"] == mes_actual)
-    ]
-
-    df_anterior = df[
-        (df["Departamento"] == "antioquia") &
-        (df["EstadoVictima"] == "muertos") &
-        (df["AnoHecho"] == anio_anterior) &
-        (df["MesVersion"] == mes_actual)
-    ]
-
-    muertes_actual = int(df_actual["NumeroRadicadoInforme"].count())
-    muertes_anterior = int(df_anterior["NumeroRadicadoInforme"].count())
-
-    variacion = muertes_actual - muertes_anterior
-    tendencia = "aumentaron" if variacion > 0 else "disminuyeron" if variacion < 0 else "se mantuvieron"
+    datos = actual()
+    fila = variacion(Departamento="antioquia", EstadoVictima="muertos").loc["total"]
 
-    return {
-        "departamento": "ANTIOQUIA",
-        "anio_actual": anio_actual,
-        "anio_anterior": anio_anterior,
-        "mes": mes_actual,
-        "muertes_anterior": muertes_anterior,
-        "muertes_actual": muertes_actual,
-        "variacion": variacion,
-        "tendencia": tendencia
-    }
+    return {"departamento": datos.etiquetar("Departamento")("antioquia"), **resumen_variacion(datos, fila)}
 
 
 # =====================
 # Q27 – VARIACIÓN NACIONAL
 # =====================
 @router.get("/Q27")
+@cacheado
 def q27():
-    df = DF_VIGENTE[DF_VIGENTE["EsVersionFinal"] == 0].copy()
-
-    # Última fecha disponible
-    ultima_fecha = pd.to_datetime(df["FechaVersion"], errors="coerce").max()
-    mes_actual = int(ultima_fecha.month)
-    anio_actual = int(ultima_fecha.year)
-    anio_anterior = anio_actual - 1
-
-    # Normalizar EstadoVictima
-    df["EstadoVictima"] = df["EstadoVictima"].astype(str).str.strip().str.lower()
-
-    # Filtrar solo muertos y el mes correspondiente
-    df_actual = df[
-        (df["EstadoVictima"] == "muertos") &
-        (df["AnoHecho"] == anio_actual) &
-        (df["MesVersion"] == mes_actual)
-    ]
-
-    df_anterior = df[
-        (df["EstadoVictima"] == "muertos") &
-        (df["AnoHecho"] == anio_anterior) &
-        (df["MesVersion"] == mes_actual)
-    ]
-
-    muertes_actual = int(df_actual["NumeroRadicadoInforme"].count())
-    muertes_anterior = int(df_anterior["NumeroRadicadoInforme"].count())
-
-    variacion = muertes_actual - muertes_anterior
-    tendencia = "aumentaron" if variacion > 0 else "disminuyeron" if variacion < 0 else "se mantuvieron"
+    datos = actual()
+    fila = variacion(EstadoVictima="muertos").loc["total"]
 
-    return {
-        "anio_actual": anio_actual,
-        "anio_anterior": anio_anterior,
-        "mes": mes_actual,
-        "muertes_anterior": muertes_anterior,
-        "muertes_actual": muertes_actual,
-        "variacion": variacion,
-        "tendencia": tendencia
-    }
+    return resumen_variacion(datos, fila)
 
 
 # =====================
 # Q28 – MUERTES MOTOCICLISTAS
 # =====================
 @router.get("/Q28")
+@cacheado
 def q28():
-    df = DF_VIGENTE[DF_VIGENTE["EsVersionFinal"] == 0].copy()
-
-    # Última fecha disponible
-    ultima_fecha = pd.to_datetime(df["FechaVersion"], errors="coerce").max()
-    mes_actual = int(ultima_fecha.month)
-    anio_actual = int(ultima_fecha.year)
-    anio_anterior = anio_actual - 1
-
-    # Normalizar columnas
-    df["EstadoVictima"] = df["EstadoVictima"].astype(str).str.strip().str.lower()
-    df["TipoVehiculo"] = df["TipoVehiculo"].astype(str).str.strip().str.lower()
-
-    # Filtrar solo motos y muertos
-    df_actual = df[
-        (df["EstadoVictima"] == "muertos") &
-        (df["TipoVehiculo"] == "motocicleta") &
-        (df["AnoHecho"] == anio_actual) &
-        (df["MesVersion"] == mes_actual)
-    ]
-
-    df_anterior = df[
-        (df["EstadoVictima"] == "muertos") &
-        (df["TipoVehiculo"] == "motocicleta") &
-        (df["AnoHecho"] == anio_anterior) &
-        (df["MesVersion"] == mes_actual)
-    ]
-
-    muertes_actual = int(df_actual["NumeroRadicadoInforme"].count())
-    muertes_anterior = int(df_anterior["NumeroRadicadoInforme"].count())
-
-    variacion = muertes_actual - muertes_anterior
-    tendencia = "aumentaron" if variacion > 0 else "disminuyeron" if variacion < 0 else "se mantuvieron"
+    datos = actual()
+    fila = variacion(EstadoVictima="muertos", TipoVehiculo="motocicleta").loc["total"]
 
-    return {
-        "anio_actual": anio_actual,
-        "anio_anterior": anio_anterior,
-        "mes": mes_actual,
-        "muertes_anterior": muertes_anterior,
-        "muertes_actual": muertes_actual,
-        "variacion": variacion,
-        "tendencia": tendencia
-    }
+    return resumen_variacion(datos, fila)
 
 
 # =====================
 # Q29 – VARIACIÓN DEPARTAMENTOS
 # =====================
 @router.get("/Q29")
+@cacheado
 def q29():
-    df = DF_VIGENTE[DF_VIGENTE["EsVersionFinal"] == 0].copy()
-
-    # Última fecha disponible
-    ultima_fecha = pd.to_datetime(df["FechaVersion"], errors="coerce").max()
-    mes_actual = int(ultima_fecha.month)
-    anio_actual = int(ultima_fecha.year)
-    anio_anterior = anio_actual - 1
-
-    # Normalizar columnas
-    df["EstadoVictima"] = df["EstadoVictima"].astype(str).str.strip().str.lower()
-    df["Departamento"] = df["Departamento"].astype(str).str.strip().str.lower()
-
-    # Filtrar solo muertos y mes actual
-    df_actual = df[
-        (df["EstadoVictima"] == "muertos") &
-        (df["AnoHecho"] == anio_actual) &
-        (df["MesVersion"] == mes_actual)
-    ]
-
-    df_anterior = df[
-        (df["EstadoVictima"] == "muertos") &
-        (df["AnoHecho"] == anio_anterior) &
-        (df["MesVersion"] == mes_actual)
-    ]
-
-    # Contar muertes por departamento
-    muertes_actual = df_actual.groupby("Departamento")["NumeroRadicadoInforme"].count()
-    muertes_anterior = df_anterior.groupby("Departamento")["NumeroRadicadoInforme"].count()
-
-    # Unir los dos años
-    comparacion = pd.concat([muertes_anterior, muertes_actual], axis=1, keys=["anterior", "actual"]).fillna(0)
-    comparacion["variacion"] = comparacion["actual"] - comparacion["anterior"]
+    datos = actual()
+
+    # Muertes por departamento en los dos años
+    comparacion = variacion(("Departamento",), EstadoVictima="muertos").rename(
+        index=datos.etiquetar("Departamento"),
+        columns={ANTERIOR: "muertes_anterior", ACTUAL: "muertes_actual"},
+    )
 
     # Clasificar departamentos
     aumentaron = comparacion[comparacion["variacion"] > 0]
@@ -931,26 +705,88 @@ def q29():
 
     # Convertir a listas
     def to_list(df):
-        return [
-            {
-                "departamento": str(idx),
-                "muertes_anterior": int(row["anterior"]),
-                "muertes_actual": int(row["actual"]),
-                "variacion": int(row["variacion"])
-            }
-            for idx, row in df.iterrows()
-        ]
+        return df.rename_axis("departamento").reset_index().to_dict(orient="records")
 
     return {
-        "anio_actual": anio_actual,
-        "anio_anterior": anio_anterior,
-        "mes": mes_actual,
+        "anio_actual": datos.anio_version,
+        "anio_anterior": datos.anio_version - 1,
+        "mes": datos.mes_version,
         "aumentaron": to_list(aumentaron),
         "disminuyeron": to_list(disminuyeron),
         "se_mantuvieron": to_list(se_mantuvieron),
         "totales": {
-            "departamentos_aumentaron": int(aumentaron.shape[0]),
-            "departamentos_disminuyeron": int(disminuyeron.shape[0]),
-            "departamentos_se_mantuvieron": int(se_mantuvieron.shape[0])
+            "departamentos_aumentaron": len(aumentaron),
+            "departamentos_disminuyeron": len(disminuyeron),
+            "departamentos_se_mantuvieron": len(se_mantuvieron)
         }
     }
+
+
+# =====================
+# CONSULTAS POR TERRITORIO
+# =====================
+# Fichas precalculadas en la instantánea (ver territorios.py): cada
+# petición es una búsqueda por nombre canónico, sin recorrer los datos.
+@router.get("/departamento/{depto}")
+def consulta_departamento(depto: str):
+    fichas = actual().territorios["departamentos"]
+    ficha = fichas.get(normalizar(depto))
+    if ficha is None:
+        raise HTTPException(status_code=404, detail=f"Departamento no encontrado: {depto}")
+    return ficha
+
+
+@router.get("/municipio/{muni}")
+def consulta_municipio(muni: str, departamento: str | None = None):
+    """Si el nombre existe en varios departamentos hay que indicar ?departamento=."""
+    territorios = actual().territorios
+    muni = normalizar(muni)
+    candidatos = territorios["municipio_a_departamentos"].get(muni, [])
+
+    if departamento is not None:
+        candidatos = [d for d in candidatos if d == normalizar(departamento)]
+    if not candidatos:
+        raise HTTPException(status_code=404, detail=f"Municipio no encontrado: {muni}")
+    if len(candidatos) > 1:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Municipio en varios departamentos ({', '.join(candidatos)}); indique ?departamento=",
+        )
+
+    return territorios["municipios"][(candidatos[0], muni)]
+
+
+# =====================
+# LOTE DE CONSULTAS
+# =====================
+CONSULTAS = {f"Q{i:02d}": globals()[f"q{i:02d}"] for i in range(1, 30)}
+
+
+@router.post("/batch")
+def batch(consultas: list[str] = Body(default=[], embed=True)):
+    """
+    Evalúa varias Qxx en una sola respuesta (lista vacía = todas). Todas usan
+    la misma instantánea de datos, con sus vistas y cubo ya calculados, y
+    pasan por la caché de resultados.
+    """
+    ids = list(dict.fromkeys(c.strip().upper() for c in consultas)) or list(CONSULTAS)
+
+    desconocidas = [c for c in ids if c not in CONSULTAS]
+    if desconocidas:
+        raise HTTPException(status_code=400, detail=f"Consultas desconocidas: {', '.join(desconocidas)}")
+
+    with fijar(actual()) as datos:
+        resultados = {c: CONSULTAS[c]() for c in ids}
+
+    return {
+        "version_datos": datos.version,
+        "resultados": resultados
+    }
+
+
+# =====================
+# ESTADO DE LA CACHÉ
+# =====================
+@router.get("/cache")
+def estado_cache():
+    return CACHE.estadisticas()
@@ -0,0 +1,249 @@
+# =========================================================
+# BACKEND POLARS PARA LAS CONSULTAS FIJAS (OPCIONAL)
+# =========================================================
+# Con CONSULTAS_BACKEND=polars las consultas que todavía recorren las
+# filas de víctimas (Q01, Q13, Q14, Q23–Q25) se ejecutan como planes
+# LazyFrame: filtro, proyección y agrupación los optimiza y paraleliza
+# Polars. El resultado agregado (pocas filas) se pasa a pandas y se le
+# aplica el mismo post-proceso que en consultas_fijas, así el JSON es
+# idéntico. Las demás consultas ya se responden desde el cubo.
+#
+# Con DATOS_COMPARTIDOS=1 el LazyFrame se arma sobre el mismo memory map
+# del dataset compartido (ver data_store.leer_compartido): cada consulta
+# decodifica al vuelo solo las columnas que usa, sin otra copia del frame.
+
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+import polars as pl
+
+import data_store
+
+# version_datos -> LazyFrame de `vigente` (ya normalizado en data_store)
+_marcos = {}
+_lock = threading.Lock()
+
+
+def escanear_compartido(ruta) -> pl.LazyFrame:
+    """
+    LazyFrame sobre el Arrow IPC compartido. Se mapea una vez con pyarrow
+    (Polars toma los buffers sin copiarlos) en lugar de scan_ipc, que abre
+    el archivo en cada collect: al escribirse una versión nueva el archivo
+    anterior se borra y las consultas en curso lo seguirían necesitando.
+    """
+    import pyarrow as pa
+
+    tabla = pa.ipc.open_file(pa.memory_map(str(ruta))).read_all()
+    columnas = json.loads(tabla.schema.metadata[b"columnas"])
+
+    # Misma codificación que data_store.codificar_columnas
+    expresiones = []
+    for col, forma in columnas.items():
+        if "categorias" in forma:
+            categorias = forma["categorias"]
+            expr = pl.col(col).replace_strict(
+                dict(enumerate(categorias)), default=None, return_dtype=pl.Enum(categorias)
+            )
+        elif "entero" in forma:
+            expr = pl.when(pl.col(f"{col}.nulos") == 0).then(pl.col(col))
+        elif forma.get("numpy", "").endswith("b1"):
+            expr = pl.col(col).cast(pl.Boolean)
+        elif "[" in forma.get("numpy", ""):
+            # Fechas: enteros de datetime64 con NaT = mínimo de int64
+            unidad = forma["numpy"].split("[")[1].rstrip("]")
+            entero = pl.col(col).reinterpret(signed=True)
+            expr = pl.when(entero != np.iinfo(np.int64).min).then(entero).cast(pl.Datetime(unidad))
+        else:
+            expr = pl.col(col)
+        expresiones.append(expr.alias(col))
+    return pl.from_arrow(tabla, rechunk=False).lazy().select(expresiones)
+
+
+def preparar(datos):
+    """Arma el LazyFrame de la instantánea una sola vez, antes de publicarla."""
+    if datos.compartido is not None:
+        marco = escanear_compartido(datos.compartido)
+    else:
+        marco = pl.from_pandas(datos.vigente).lazy()
+    publicada = data_store.actual().version if data_store.listo() else None
+    with _lock:
+        _marcos[datos.version] = marco
+        # Hasta publicar conviven la versión publicada y la que se prepara
+        for version in list(_marcos):
+            if version not in (datos.version, publicada):
+                del _marcos[version]
+
+
+def soltar_anteriores(datos):
+    """Ya publicada la versión nueva, la copia Polars de la anterior sobra."""
+    with _lock:
+        for version in list(_marcos):
+            if version != datos.version:
+                del _marcos[version]
+
+
+data_store.al_preparar(preparar)
+data_store.al_publicar(soltar_anteriores)
+
+
+def marco(datos) -> pl.LazyFrame:
+    with _lock:
+        encontrado = _marcos.get(datos.version)
+    if encontrado is None:
+        preparar(datos)
+        with _lock:
+            encontrado = _marcos[datos.version]
+    return encontrado
+
+
+def final(datos) -> pl.LazyFrame:
+    return marco(datos).filter(pl.col("VersionFinalActual") == 1)
+
+
+def contar_por(lf: pl.LazyFrame, columnas, medida=None) -> pd.Series:
+    """
+    Como df.groupby(columnas, observed=True)[medida].count() (o nunique si
+    medida es una expresión): sin claves nulas y ordenado por las etiquetas.
+    """
+    columnas = [columnas] if isinstance(columnas, str) else list(columnas)
+    if medida is None:
+        medida = pl.col("NumeroRadicadoInforme").count()
+
+    conteo = (
+        lf.drop_nulls(columnas)
+        .group_by(columnas)
+        .agg(medida.alias("n"))
+        # Etiquetas como texto: pandas ordena los Categorical alfabéticamente
+        .with_columns(pl.col(pl.Categorical, pl.Enum).cast(pl.String))
+        .collect()
+        .to_pandas()
+    )
+    return conteo.set_index(columnas)["n"].sort_index().rename(None)
+
+
+# =====================
+# Q01 – TOTAL ÚLTIMOS 3 AÑOS
+# =====================
+def q01():
+    datos = data_store.actual()
+    lf = final(datos)
+
+    anios = (
+        lf.select(pl.col("AnoHecho").drop_nulls().unique().sort().tail(3))
+        .collect()["AnoHecho"].to_list()
+    )
+
+    distintos = pl.col("IdRadicado").filter(pl.col("IdRadicado") >= 0).n_unique()
+    pivot = (
+        contar_por(lf.filter(pl.col("AnoHecho").is_in(anios)), ["AnoHecho", "EstadoVictima"], distintos)
+        .unstack(fill_value=0)
+    )
+
+    return pd.DataFrame({
+        "Lesionados": pivot.get("lesionados", 0),
+        "Muertos": pivot.get("muertos", 0),
+        "Total": pivot.sum(axis=1),
+    }).T
+
+
+# =====================
+# Q13 – DÍA CON MÁS SINIESTROS
+# =====================
+def q13():
+    datos = data_store.actual()
+    anio_actual = datos.anio_final
+
+    lf = final(datos).filter(pl.col("AnoHecho") == anio_actual)
+    conteo = contar_por(lf, ["DiaOcurrencia", "EstadoVictima"]).unstack(fill_value=0)
+    conteo.columns = conteo.columns.astype(str)
+
+    for col in ["muertos", "lesionados"]:
+        if col not in conteo.columns:
+            conteo[col] = 0
+
+    conteo["total"] = conteo["muertos"] + conteo["lesionados"]
+
+    return {
+        "anio": anio_actual,
+        "dias": conteo[["total", "muertos", "lesionados"]].T
+    }
+
+
+# =====================
+# Q14 – FESTIVOS VS NO FESTIVOS
+# =====================
+def q14():
+    datos = data_store.actual()
+    a = datos.anio_final
+
+    fila = (
+        final(datos)
+        .filter(pl.col("AnoHecho") == a)
+        .select(
+            (pl.col("EsFestivo") | pl.col("EsFinDeSemana")).sum().alias("festivos"),
+            pl.len().alias("total"),
+        )
+        .collect()
+        .row(0)
+    )
+    festivos_count, total = fila
+
+    return {
+        "anio": a,
+        "FESTIVO_O_FINDES": festivos_count,
+        "DIA_HABIL": total - festivos_count
+    }
+
+
+# =====================
+# Q23 – OBJETO COLISIÓN
+# =====================
+def q23():
+    datos = data_store.actual()
+    a = datos.anio_final
+
+    top1 = (
+        contar_por(final(datos).filter(pl.col("AnoHecho") == a), "ObjetoColision")
+        .sort_values(ascending=False)
+        .head(1)
+    )
+
+    if top1.empty:
+        return {"anio": a, "objeto_colision": None, "cantidad": 0}
+
+    return {
+        "anio": a,
+        "objeto_colision": top1.index[0],
+        "cantidad": top1.iloc[0]
+    }
+
+
+# =====================
+# Q24 / Q25 – TOP 5 ENTRE MUERTOS DEL ÚLTIMO AÑO
+# =====================
+def top5_muertos(columna: str, etiqueta: str):
+    datos = data_store.actual()
+    muertos = final(datos).filter(pl.col("EstadoVictima") == "muertos")
+
+    a = int(muertos.select(pl.col("AnoHecho").max()).collect().item())
+
+    top5 = (
+        contar_por(muertos.filter(pl.col("AnoHecho") == a), columna)
+        .sort_values(ascending=False)
+        .head(5)
+    )
+
+    return {
+        "anio": a,
+        "top5": top5.rename_axis(etiqueta).reset_index(name="cantidad").to_dict(orient="records")
+    }
+
+
+def q24():
+    return top5_muertos("Hipotesis", "hipotesis")
+
+
+def q25():
+    return top5_muertos("CausaMuerte", "causa_muerte")
@@ -1,25 +1,149 @@
-import polars as pl
+# =========================================================
+# CONVERSIÓN CSV -> PARQUET PARTICIONADO
+# =========================================================
+# Lee el CSV en streaming (Polars scan_csv / sink_parquet, sin cargarlo
+# completo en memoria) y escribe un dataset Parquet particionado estilo
+# hive por AnoHecho (y opcionalmente MesVersion):
+#
+#   datos/MLrefinado.parquet/AnoHecho=2024/MesVersion=6/parte-0.parquet
+#
+# El CSV se recorre una sola vez: un sink particionado (pl.PartitionBy)
+# reparte las filas en archivos intermedios por partición. Después cada
+# partición (no el dataset completo) se ordena por las columnas de filtro
+# principales y se reescribe con compresión zstd, texto repetido como
+# diccionario y estadísticas min/max por row group. data_store lee el
+# directorio igual que un archivo único.
+#
+# Uso:
+#   python convertir_parquet.py [--csv RUTA] [--salida RUTA] [--por-mes]
+
+import argparse
+import shutil
+import tempfile
+from pathlib import Path
 
-csv_path = "backend/datos/MLrefinado.csv"
-parquet_path = "backend/datos/MLrefinado.parquet"
+import polars as pl
 
-print("📥 Leyendo CSV...")
+DATA_DIR = Path(__file__).resolve().parent / "datos"
+CSV_PATH = DATA_DIR / "MLrefinado.csv"
+PARQUET_PATH = DATA_DIR / "MLrefinado.parquet"
 
 # Columnas que sabemos que son identificadores (texto)
-columnas_texto = [
-    "NoticiaCriminal",
-    "NumeroRadicadoInforme"
-]
+COLUMNAS_ID = ["NoticiaCriminal", "NumeroRadicadoInforme"]
+
+# Fechas: se dejan como texto, data_store las convierte al cargar
+COLUMNAS_FECHA = ["FechaHecho", "FechaVersion"]
+
+# Orden dentro de cada archivo: los filtros de las vistas primero, así
+# las estadísticas de cada row group descartan la mayoría al filtrar
+ORDEN = ["VersionFinalActual", "EsVersionFinal", "EstadoVictima", "Departamento", "Municipio"]
+
+
+def a_utf8(origen: Path, destino: Path, codificacion: str):
+    """scan_csv solo lee UTF-8: recodifica por bloques, sin cargar el archivo."""
+    with open(origen, encoding=codificacion, newline="") as entrada, \
+            open(destino, "w", encoding="utf-8", newline="") as salida:
+        shutil.copyfileobj(entrada, salida, 16 * 1024 * 1024)
+
+
+def escanear(csv_utf8: Path) -> pl.LazyFrame:
+    # Mismo formato que lee data_store: separador ";"
+    lf = pl.scan_csv(
+        csv_utf8,
+        separator=";",
+        infer_schema_length=20000,  # analizamos muchas filas
+        schema_overrides={col: pl.Utf8 for col in COLUMNAS_ID},
+    )
+
+    # Texto repetido como Categorical: se escribe con codificación de diccionario
+    esquema = lf.collect_schema()
+    categoricas = [
+        col for col, tipo in esquema.items()
+        if tipo == pl.Utf8 and col not in COLUMNAS_ID + COLUMNAS_FECHA
+    ]
+    return lf.with_columns(pl.col(categoricas).cast(pl.Categorical))
+
+
+def carpeta_particion(base: Path, claves: dict) -> Path:
+    for col, valor in claves.items():
+        base = base / f"{col}={'__HIVE_DEFAULT_PARTITION__' if valor is None else valor}"
+    return base
+
+
+def convertir(csv_path: Path, salida: Path, por_mes: bool = False,
+              codificacion: str = "latin-1", nivel_zstd: int = 6,
+              filas_por_grupo: int = 128_000):
+    particiones = ["AnoHecho", "MesVersion"] if por_mes else ["AnoHecho"]
+
+    with tempfile.TemporaryDirectory(dir=salida.parent) as tmp:
+        tmp = Path(tmp)
+
+        if codificacion.lower().replace("-", "") in ("utf8", "utf8lossy"):
+            csv_utf8 = csv_path
+        else:
+            print("🔤 Recodificando CSV a UTF-8...")
+            csv_utf8 = tmp / "origen.csv"
+            a_utf8(csv_path, csv_utf8, codificacion)
+
+        lf = escanear(csv_utf8)
+        orden = [c for c in ORDEN if c in lf.collect_schema()]
+
+        # 1. Una sola pasada por el CSV: cada fila va a su partición
+        print(f"🗂️ Particionando por {', '.join(particiones)}...")
+        intermedio = tmp / "intermedio"
+        lf.sink_parquet(
+            pl.PartitionBy(intermedio, key=particiones, include_key=False),
+            mkdir=True,
+            compression="lz4",
+        )
+
+        # 2. Cada partición se ordena y se escribe con la compresión final;
+        # solo una partición a la vez en memoria
+        nuevo = tmp / "dataset"
+        carpetas = sorted({archivo.parent for archivo in intermedio.rglob("*.parquet")})
+        filas = 0
+        for carpeta in carpetas:
+            destino = nuevo / carpeta.relative_to(intermedio)
+            destino.mkdir(parents=True)
+            (
+                pl.scan_parquet(sorted(carpeta.glob("*.parquet")), hive_partitioning=False)
+                .sort(orden, nulls_last=True)
+                .sink_parquet(
+                    destino / "parte-0.parquet",
+                    compression="zstd",
+                    compression_level=nivel_zstd,
+                    statistics=True,
+                    row_group_size=filas_por_grupo,
+                )
+            )
+            # Solo lee los metadatos del archivo
+            filas += pl.scan_parquet(destino / "parte-0.parquet").select(pl.len()).collect().item()
+        print(f"🗂️ Particiones: {len(carpetas)}")
+
+        # Se reemplaza la salida anterior (archivo o directorio) ya completa,
+        # para que data_store nunca vea un dataset a medio escribir
+        if salida.exists():
+            viejo = tmp / "anterior"
+            salida.rename(viejo)
+        nuevo.rename(salida)
+
+    print(f"✅ {filas} filas escritas en {salida}")
+
 
-df = pl.read_csv(
-    csv_path,
-    infer_schema_length=20000,  # analizamos muchas filas
-    schema_overrides={col: pl.Utf8 for col in columnas_texto}
-)
+def main():
+    parser = argparse.ArgumentParser(description="Convierte el CSV de siniestralidad a Parquet particionado")
+    parser.add_argument("--csv", type=Path, default=CSV_PATH, help="CSV de origen (separador ';')")
+    parser.add_argument("--salida", type=Path, default=PARQUET_PATH, help="Directorio del dataset Parquet")
+    parser.add_argument("--por-mes", action="store_true", help="Particionar también por MesVersion")
+    parser.add_argument("--codificacion", default="latin-1", help="Codificación del CSV")
+    parser.add_argument("--nivel-zstd", type=int, default=6)
+    parser.add_argument("--filas-por-grupo", type=int, default=128_000, help="Filas por row group")
+    args = parser.parse_args()
 
-print(f"✅ CSV cargado: {df.shape[0]} filas, {df.shape[1]} columnas")
+    print("📥 Leyendo CSV:", args.csv)
+    convertir(args.csv, args.salida, args.por_mes, args.codificacion, args.nivel_zstd, args.filas_por_grupo)
+    print("🎉 Conversión finalizada con éxito")
 
-print("💾 Guardando archivo Parquet...")
-df.write_parquet(parquet_path)
 
-print("🎉 Conversión finalizada con éxito")
+if __name__ == "__main__":
+    main()
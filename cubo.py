@@ -0,0 +1,81 @@
+# =========================================================
+# CUBO DE CONTEOS PRE-AGREGADO
+# =========================================================
+# Se construye una vez por vista (final / preliminar) al cargar los datos:
+# una fila por combinación observada de las dimensiones, con el número de
+# filas y de NumeroRadicadoInforme no nulos. Las consultas fijas suman
+# sobre el cubo en lugar de filtrar el frame de víctimas.
+
+import numpy as np
+import pandas as pd
+
+DIMENSIONES = [
+    "AnoHecho", "MesHecho", "MesVersion",
+    "Departamento", "Municipio", "Zona",
+    "EstadoVictima", "ActorVial", "TipoVehiculo", "Sexo",
+    "RangoEdad", "ClaseAccidente", "Rango3horas",
+]
+
+# Medidas del cubo
+FILAS = "filas"          # equivale a d.shape[0]
+REGISTROS = "registros"  # equivale a d["NumeroRadicadoInforme"].count()
+
+
+def construir_cubo(df: pd.DataFrame) -> pd.DataFrame:
+    dims = [c for c in DIMENSIONES if c in df.columns]
+    return (
+        df.groupby(dims, observed=True, dropna=False)
+        .agg(**{
+            FILAS: ("NumeroRadicadoInforme", "size"),
+            REGISTROS: ("NumeroRadicadoInforme", "count"),
+        })
+        .reset_index()
+    )
+
+
+def filtrar(cubo: pd.DataFrame, **filtros) -> pd.DataFrame:
+    """Filtros por igualdad (o pertenencia si el valor es lista) sobre las dimensiones."""
+    mascara = np.ones(len(cubo), dtype=bool)
+    for columna, valor in filtros.items():
+        if isinstance(valor, (list, tuple, set)):
+            coincide = cubo[columna].isin(list(valor))
+        else:
+            coincide = cubo[columna] == valor
+        mascara &= coincide.to_numpy(dtype=bool, na_value=False)
+    return cubo[mascara]
+
+
+def contar(cubo: pd.DataFrame, medida: str = REGISTROS, **filtros) -> int:
+    return int(filtrar(cubo, **filtros)[medida].sum())
+
+
+def por(cubo: pd.DataFrame, columnas, medida: str = REGISTROS, **filtros) -> pd.Series:
+    """Conteo agrupado por una o varias dimensiones (como groupby(...).count())."""
+    return (
+        filtrar(cubo, **filtros)
+        .groupby(columnas, observed=True)[medida]
+        .sum()
+    )
+
+
+def combinar(*cubos: pd.DataFrame, restar: pd.DataFrame | None = None) -> pd.DataFrame:
+    """
+    Suma celda a celda cubos con las mismas dimensiones (y resta `restar`):
+    mantiene el cubo de una vista cuando se agregan o quitan filas sin
+    volver a agrupar el frame completo. Se descartan las celdas que quedan
+    en cero.
+    """
+    partes = list(cubos)
+    if restar is not None and len(restar):
+        negativo = restar.copy()
+        negativo[[FILAS, REGISTROS]] *= -1
+        partes.append(negativo)
+
+    dims = [c for c in DIMENSIONES if c in partes[0].columns]
+    suma = (
+        pd.concat(partes, ignore_index=True)
+        .groupby(dims, observed=True, dropna=False)[[FILAS, REGISTROS]]
+        .sum()
+        .reset_index()
+    )
+    return suma[suma[FILAS] != 0].reset_index(drop=True)
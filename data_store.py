@@ -1,17 +1,72 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+import numpy as np
 import pandas as pd
 from pathlib import Path
-import unicodedata
+
+from cubo import combinar, construir_cubo
+from diccionarios import normalizar
+from distintos import IDENTIFICADORES, factorizar_con_valores, factorizar_ids
+import festivos
+from indice import VACIO, buscar, construir_indice, extender_indice
+from territorios import construir_territorios
 
 # ===============================
 # UTILIDAD
 # ===============================
-def normalizar(texto: str) -> str:
-    if not isinstance(texto, str):
-        return texto
-    texto = texto.lower().strip()
-    texto = unicodedata.normalize("NFD", texto)
-    texto = "".join(c for c in texto if unicodedata.category(c) != "Mn")
-    return texto
+def etiqueta_preferida(a: str | None, b: str) -> str:
+    """
+    Entre dos grafías del mismo valor canónico, la que conserva tildes y
+    eñes ("PEATÓN" sobre "PEATON"); a igualdad, la menor. No depende del
+    orden ni de la frecuencia: carga completa y deltas eligen lo mismo.
+    """
+    if a is None:
+        return b
+    return min(a, b, key=lambda e: (-sum(not c.isascii() for c in e), e))
+
+
+def combinar_etiquetas(*grupos: dict) -> dict:
+    """Une los diccionarios columna -> {canónico: etiqueta} de varias cargas."""
+    resultado = {}
+    for grupo in grupos:
+        for col, etiquetas in grupo.items():
+            destino = resultado.setdefault(col, {})
+            for canonico, etiqueta in etiquetas.items():
+                destino[canonico] = etiqueta_preferida(destino.get(canonico), etiqueta)
+    return resultado
+
+
+def normalizar_serie(serie: pd.Series) -> tuple[pd.Series, dict]:
+    """
+    Normaliza una columna de texto llamando a normalizar() una sola vez por
+    valor distinto y devuelve un Categorical construido desde los códigos,
+    junto con la etiqueta de presentación de cada valor canónico.
+    """
+    codigos, valores = pd.factorize(serie)
+    canonicos = pd.Index([normalizar(v) for v in valores])
+    categorias = canonicos.unique().sort_values()
+
+    etiquetas = {}
+    for valor, canonico in zip(valores, canonicos):
+        etiquetas[canonico] = etiqueta_preferida(etiquetas.get(canonico), str(valor).strip().upper())
+
+    # Varios valores crudos pueden dar el mismo canónico ("PEATÓN", "Peatón").
+    # El -1 final hace que los nulos (código -1) sigan siendo nulos.
+    remapeo = np.append(categorias.get_indexer(canonicos), -1)
+    codigos = remapeo[codigos]
+
+    normalizada = pd.Series(
+        pd.Categorical.from_codes(codigos, categories=categorias),
+        index=serie.index,
+        name=serie.name,
+    )
+    return normalizada, etiquetas
 
 
 # ===============================
@@ -20,45 +75,829 @@ def normalizar(texto: str) -> str:
 BASE_DIR = Path(__file__).resolve().parent
 DATA_DIR = BASE_DIR / "datos"
 CSV_PATH = DATA_DIR / "MLrefinado.csv"
+PARQUET_PATH = DATA_DIR / "MLrefinado.parquet"
+ENTRANTES_DIR = DATA_DIR / "entrantes"  # deltas mensuales para /admin/ingerir
+
+# ===============================
+# ESQUEMA (SOLO COLUMNAS USADAS)
+# ===============================
+# Columnas que leen consultas_fijas y ejecutor; el resto no se carga
+COLUMNAS_TEXTO = [
+    "NumeroRadicadoInforme", "NoticiaCriminal",
+    "Departamento", "Municipio", "Zona",
+    "EstadoVictima", "ActorVial", "TipoVehiculo", "Sexo",
+    "RangoEdad", "Rango3horas", "DiaOcurrencia",
+    "ClaseAccidente", "ObjetoColision", "Hipotesis", "CausaMuerte",
+]
+COLUMNAS_FECHA = ["FechaHecho", "FechaVersion"]
+
+# Tipos declarados (enteros pequeños con soporte de nulos)
+DTYPES = {
+    "AnoHecho": "Int16",
+    "MesHecho": "Int8",
+    "MesVersion": "Int8",
+    "EsVersionFinal": "Int8",
+    "VersionFinalActual": "Int8",
+    "NumeroRadicadoInforme": str,
+    "NoticiaCriminal": str,
+}
+
+COLUMNAS = list(DTYPES) + [c for c in COLUMNAS_TEXTO if c not in DTYPES] + COLUMNAS_FECHA
+
+
+# ===============================
+# CARGA (PARQUET SI EXISTE, SI NO CSV)
+# ===============================
+# PARQUET_PATH puede ser un archivo o el directorio particionado por
+# AnoHecho (/MesVersion) que escribe convertir_parquet.py
+def particionado(ruta: Path):
+    """
+    Claves hive del dataset con su tipo declarado. Sin esquema, pyarrow las
+    infiere como diccionario y no puede unificarlas si hay una partición de
+    nulos (AnoHecho=__HIVE_DEFAULT_PARTITION__).
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    claves = ["AnoHecho", "MesVersion"] if any(ruta.glob("AnoHecho=*/MesVersion=*")) else ["AnoHecho"]
+    tipos = {"Int16": pa.int16(), "Int8": pa.int8()}
+    return ds.partitioning(pa.schema([(c, tipos[DTYPES[c]]) for c in claves]), flavor="hive")
+
+
+def cargar_dataset() -> tuple[pd.DataFrame, Path]:
+    """Devuelve el DataFrame y la ruta del archivo del que se leyó."""
+    if PARQUET_PATH.exists():
+        try:
+            print("📂 Cargando Parquet desde:", PARQUET_PATH)
+            opciones = {"partitioning": particionado(PARQUET_PATH)} if PARQUET_PATH.is_dir() else {}
+            df = pd.read_parquet(PARQUET_PATH, columns=COLUMNAS, **opciones).astype(DTYPES)
+            return df, PARQUET_PATH
+        except (ImportError, ValueError, OSError) as e:
+            print("⚠️ No se pudo leer el Parquet, se usa el CSV:", e)
+
+    print("📂 Cargando CSV desde:", CSV_PATH)
+    return leer_csv(CSV_PATH), CSV_PATH
+
+
+def leer_csv(ruta: Path) -> pd.DataFrame:
+    """CSV con el formato de MLrefinado.csv (también los deltas mensuales)."""
+    return pd.read_csv(
+        ruta,
+        sep=";",
+        encoding="latin-1",
+        usecols=COLUMNAS,
+        dtype=DTYPES,
+        parse_dates=COLUMNAS_FECHA,
+    )
+
+
+def tamano_y_fecha(ruta: Path) -> tuple[int, int]:
+    """Tamaño y última modificación; para un dataset particionado, de todos sus archivos."""
+    if ruta.is_dir():
+        stats = [p.stat() for p in ruta.rglob("*.parquet")]
+        return sum(st.st_size for st in stats), max((st.st_mtime_ns for st in stats), default=0)
+    stat = ruta.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def version_dataset(df: pd.DataFrame, ruta: Path) -> str:
+    """
+    Identificador corto de los datos cargados: cambia si cambia el archivo
+    (tamaño o fecha de modificación) o la FechaVersion más reciente.
+    """
+    tamano, modificado = tamano_y_fecha(ruta)
+    firma = f"{ruta.name}|{tamano}|{modificado}|{df['FechaVersion'].max()}|{len(df)}"
+    return hashlib.sha1(firma.encode()).hexdigest()[:12]
+
+
+# Columnas de dimensión: se canonicalizan una sola vez (minúsculas, sin
+# tildes, sin espacios) y se guardan como Categorical. Las consultas
+# comparan directamente contra el valor canónico (ej: "muertos", "peaton").
+COLUMNAS_DIMENSION = [
+    "Departamento", "Municipio", "Zona",
+    "EstadoVictima", "ActorVial", "TipoVehiculo", "Sexo",
+]
+
+# Con Copy-on-Write las consultas comparten las vistas sin copiarlas y
+# cualquier escritura accidental genera su propia copia (siempre activo en
+# pandas >= 3)
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
 
-print("📂 Cargando CSV desde:", CSV_PATH)
 
 # ===============================
-# CARGA CSV (UNA SOLA VEZ)
+# COMPACTACIÓN EN MEMORIA
 # ===============================
-df = pd.read_csv(CSV_PATH, sep=";", encoding="latin-1", low_memory=False)
+# Texto repetido que no se canonicaliza (las consultas lo comparan y
+# devuelven tal cual): se guarda como Categorical sin cambiar los valores
+COLUMNAS_CATEGORIA = [
+    c for c in COLUMNAS_TEXTO if c not in COLUMNAS_DIMENSION and c not in IDENTIFICADORES
+]
 
 
+def tipo_cadena_arrow():
+    """Tipo de cadenas respaldadas por Arrow, o None si no hay pyarrow."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return None
+    return "string[pyarrow]"
 
 
+def compactar(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Texto repetido como Categorical, identificadores como cadenas Arrow
+    (un solo buffer en lugar de un objeto Python por fila) y enteros sin
+    nulos al tipo más pequeño que los contiene.
+    """
+    for col in COLUMNAS_CATEGORIA:
+        if col not in df.columns:
+            continue
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            # Leída de un Parquet con diccionario: mismas categorías (ordenadas,
+            # solo las presentes) que con astype("category")
+            serie = df[col].cat.remove_unused_categories()
+            df[col] = serie.cat.reorder_categories(serie.cat.categories.sort_values())
+        else:
+            df[col] = df[col].astype("category")
+
+    tipo = tipo_cadena_arrow()
+    if tipo is not None:
+        for col in IDENTIFICADORES:
+            if col in df.columns:
+                df[col] = df[col].astype(tipo)
+
+    for col in df.select_dtypes(include=np.integer).columns:
+        df[col] = pd.to_numeric(df[col], downcast="integer")
+
+    return df
+
+
+def reportar_memoria(antes: pd.Series, df: pd.DataFrame):
+    """Bytes por columna antes de normalizar/compactar y después."""
+    despues = df.memory_usage(deep=True, index=False)
+    ahorro = antes.sub(despues, fill_value=0)
+    mb = 1024 ** 2
+    print(f"💾 Memoria: {antes.sum() / mb:.1f} MB -> {despues.sum() / mb:.1f} MB (ahorro por columna)")
+    for col, bytes_ahorrados in ahorro[ahorro != 0].sort_values(ascending=False).items():
+        print(f"   {col}: {bytes_ahorrados / mb:+.2f} MB")
+
+
+# ===============================
+# DATOS CARGADOS (INSTANTÁNEA)
+# ===============================
+@dataclass(frozen=True)
+class Datos:
+    """
+    Instantánea inmutable del dataset y sus vistas derivadas. Cada consulta
+    toma una sola vez actual() y trabaja sobre ella, así una recarga en
+    paralelo no mezcla datos de dos versiones.
+    """
+    vigente: pd.DataFrame
+    final: pd.DataFrame          # VersionFinalActual == 1 (Q01, Q02, Q04–Q25)
+    preliminar: pd.DataFrame     # EsVersionFinal == 0 (Q03, Q26–Q29)
+    cubo_final: pd.DataFrame     # conteos pre-agregados de cada vista (ver cubo.py)
+    cubo_preliminar: pd.DataFrame
+    indice: dict                 # posting lists de `vigente` para ejecutor (ver indice.py)
+    territorios: dict            # fichas por departamento/municipio (ver territorios.py)
+    etiquetas: dict              # columna -> {valor canónico: etiqueta de presentación}
+    noticias: pd.Index           # NoticiaCriminal de cada IdNoticia (posición = código)
+    anio_actual: int
+    anio_final: int
+    fecha_version: pd.Timestamp  # último corte publicado de la preliminar
+    mes_version: int
+    anio_version: int
+    version: str
+    archivo: Path
+    compartido: Path | None = None  # Arrow IPC del que se mapeó `vigente` (ver leer_compartido)
+
+    def etiquetar(self, columna: str):
+        """Función valor canónico -> etiqueta de presentación (para .rename)."""
+        etiquetas = self.etiquetas.get(columna, {})
+        return lambda valor: etiquetas.get(valor, str(valor).upper())
+
+
+# ===============================
+# PROGRESO DE CARGA
+# ===============================
+ETAPAS = [
+    "leyendo archivo", "normalizando", "compactando",
+    "vistas y cubos", "indice", "territorios",
+]
+
+_progreso = {"etapa": "pendiente", "paso": 0, "inicio": None, "error": None}
+
+
+def avanzar(etapa: str):
+    _progreso.update(etapa=etapa, paso=ETAPAS.index(etapa) + 1)
+
+
+def progreso() -> dict:
+    """Estado de la carga en curso (o de la última) para /ready."""
+    inicio = _progreso["inicio"]
+    return {
+        "etapa": _progreso["etapa"],
+        "paso": _progreso["paso"],
+        "pasos": len(ETAPAS),
+        "segundos": round(time.monotonic() - inicio, 1) if inicio else None,
+        "error": _progreso["error"],
+    }
+
 
 # ===============================
 # NORMALIZACIONES
 # ===============================
-df["FechaHecho"] = pd.to_datetime(df["FechaHecho"], errors="coerce")
-df["FechaVersion"] = pd.to_datetime(df["FechaVersion"], errors="coerce")
+def normalizar_frame(df: pd.DataFrame) -> tuple[pd.DataFrame, dict]:
+    """
+    Fechas, banderas de festivo y dimensiones canónicas (carga completa y
+    deltas). Devuelve también las etiquetas de presentación por columna.
+    """
+    df["FechaHecho"] = pd.to_datetime(df["FechaHecho"], errors="coerce")
+    df["FechaVersion"] = pd.to_datetime(df["FechaVersion"], errors="coerce")
+
+    # Festivos (calendario generado para cada año presente) y fines de semana
+    df["EsFestivo"], df["EsFinDeSemana"] = festivos.marcar(df["FechaHecho"])
+
+    etiquetas = {}
+    for col in COLUMNAS_DIMENSION:
+        if col in df.columns:
+            df[col], etiquetas[col] = normalizar_serie(df[col])
+    return df, etiquetas
+
+
+def indice_noticias(valores) -> pd.Index:
+    """Texto de cada IdNoticia como Index (cadenas Arrow si hay pyarrow)."""
+    return pd.Index(valores, dtype=tipo_cadena_arrow() or object, name="NoticiaCriminal")
+
+
+def preparar_frame() -> tuple[pd.DataFrame, dict, pd.Index, Path]:
+    """Lee el archivo de datos y deja el frame normalizado y compactado."""
+    df, archivo = cargar_dataset()
+    memoria_inicial = df.memory_usage(deep=True, index=False)
+
+    avanzar("normalizando")
+    df, etiquetas = normalizar_frame(df)
+
+    # Identificadores como códigos enteros para contar incidentes distintos
+    # (ver distintos.py). NoticiaCriminal solo se usa así: de su texto queda
+    # un valor por código, para que los deltas reutilicen los códigos
+    df["IdRadicado"] = factorizar_ids(df["NumeroRadicadoInforme"])
+    df["IdNoticia"], noticias = factorizar_con_valores(df["NoticiaCriminal"])
+    df = df.drop(columns="NoticiaCriminal")
+
+    avanzar("compactando")
+    df = compactar(df)
+    reportar_memoria(memoria_inicial, df)
+    return df, etiquetas, indice_noticias(noticias), archivo
 
-for col in ["Departamento", "Municipio", "Zona", "EstadoVictima"]:
-    if col in df.columns:
-        df[col] = df[col].apply(normalizar)
 
 # ===============================
-# VARIABLES GLOBALES
+# DATASET COMPARTIDO ENTRE WORKERS (OPCIONAL)
 # ===============================
-FECHA_MAX = df["FechaVersion"].max()
-ULTIMO_MES_VERSION = FECHA_MAX.month
-ANIO_ACTUAL = int(df["AnoHecho"].max())
+# Con DATOS_COMPARTIDOS=1 el primer worker guarda el frame ya normalizado
+# como Arrow IPC sin comprimir en datos/compartido/ y todos lo abren con
+# memory map: el sistema operativo mantiene una sola copia en page cache.
+#
+# Para que pandas use esas páginas sin copiarlas, cada columna se guarda
+# como un solo arreglo de ancho fijo y se reconstruye encima del mapeo:
+# Categorical = códigos enteros (categorías en los metadatos), enteros con
+# nulos = valores + máscara uint8, bool y fechas = su representación
+# entera. El texto (NumeroRadicadoInforme) queda como cadenas Arrow.
+COMPARTIDO_ACTIVO = os.environ.get("DATOS_COMPARTIDOS", "0") == "1"
+COMPARTIDO_DIR = DATA_DIR / "compartido"
+
+# Cambiarlo invalida los archivos guardados (ej: si cambia la normalización)
+FORMATO_COMPARTIDO = 4
+
+
+def ruta_origen() -> Path:
+    return PARQUET_PATH if PARQUET_PATH.exists() else CSV_PATH
+
+
+def ruta_compartida() -> Path:
+    firma = f"{FORMATO_COMPARTIDO}|{_firma_archivos()}"
+    return COMPARTIDO_DIR / f"vigente-{hashlib.sha1(firma.encode()).hexdigest()[:12]}.arrow"
+
+
+def ruta_noticias(ruta: Path) -> Path:
+    """Archivo con el texto de cada IdNoticia, junto al dataset compartido."""
+    return ruta.with_name(ruta.name.replace("vigente-", "noticias-", 1))
+
+
+@contextmanager
+def bloqueo_archivo(ruta: Path):
+    """Un solo proceso a la vez prepara el archivo compartido (no-op sin fcntl)."""
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(ruta.with_suffix(".lock"), "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def ordenar_para_vistas(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ordena las filas para que `final` y `preliminar` sean rangos contiguos
+    (ver vista): solo final, ambas, solo preliminar, ninguna.
+    """
+    es_final = (df["VersionFinalActual"] == 1).to_numpy(dtype=bool, na_value=False)
+    es_preliminar = (df["EsVersionFinal"] == 0).to_numpy(dtype=bool, na_value=False)
+    grupo = np.select(
+        [es_final & ~es_preliminar, es_final, es_preliminar], [0, 1, 2], default=3
+    )
+    return df.iloc[np.argsort(grupo, kind="stable")].reset_index(drop=True)
+
+
+def escribir_compartido(df: pd.DataFrame, etiquetas: dict, noticias: pd.Index, ruta: Path):
+    import pyarrow as pa
+    from pyarrow import feather
+
+    # Primero las noticias: el dataset existe solo cuando todo está escrito
+    temporal = ruta_noticias(ruta).with_suffix(".tmp")
+    feather.write_feather(
+        pa.table({"NoticiaCriminal": pa.array(noticias.to_numpy(), type=pa.string())}),
+        temporal, compression="uncompressed",
+    )
+    os.replace(temporal, ruta_noticias(ruta))
+
+    # Cómo reconstruir cada columna y las etiquetas viajan en los metadatos
+    arreglos, columnas = codificar_columnas(ordenar_para_vistas(df))
+    tabla = pa.table(arreglos).replace_schema_metadata({
+        b"columnas": json.dumps(columnas, ensure_ascii=False).encode(),
+        b"etiquetas": json.dumps(etiquetas, ensure_ascii=False).encode(),
+    })
+
+    # Un solo bloque por columna: cada una es un arreglo contiguo en el archivo
+    temporal = ruta.with_suffix(".tmp")
+    feather.write_feather(tabla, temporal, compression="uncompressed", chunksize=max(len(df), 1))
+    os.replace(temporal, ruta)
+
+    # Versiones anteriores: los procesos que aún las tienen abiertas
+    # conservan su mapeo hasta soltarlas
+    firma = ruta.stem.removeprefix("vigente-")
+    for viejo in [*COMPARTIDO_DIR.glob("vigente-*"), *COMPARTIDO_DIR.glob("noticias-*")]:
+        if viejo.stem.split("-", 1)[1] != firma:
+            try:
+                viejo.unlink()
+            except OSError:
+                pass
+
+
+def codificar_columnas(df: pd.DataFrame) -> tuple[dict, dict]:
+    """Columnas como arreglos de ancho fijo (ver leer_compartido) y cómo reconstruirlas."""
+    import pyarrow as pa
+
+    arreglos, columnas = {}, {}
+    for col in df.columns:
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            arreglos[col] = serie.cat.codes.to_numpy()
+            columnas[col] = {"categorias": serie.cat.categories.tolist()}
+        elif isinstance(serie.array, pd.arrays.IntegerArray):
+            nulos = serie.isna().to_numpy()
+            arreglos[col] = serie.to_numpy(dtype=serie.dtype.numpy_dtype, na_value=0)
+            arreglos[f"{col}.nulos"] = nulos.view(np.uint8)
+            columnas[col] = {"entero": str(serie.dtype)}
+        elif isinstance(serie.dtype, np.dtype) and serie.dtype.kind in "biufmM":
+            valores = serie.to_numpy()
+            # Arrow guarda bool como bits y NaT como nulo: se escriben sus bytes
+            if valores.dtype.kind in "bmM":
+                valores = valores.view(f"u{valores.dtype.itemsize}")
+            arreglos[col] = valores
+            columnas[col] = {"numpy": serie.dtype.str}
+        else:
+            arreglos[col] = pa.array(serie, from_pandas=True)
+            # Cadenas Arrow: se reabren con el mismo dtype, sobre el mapeo
+            tipo = serie.dtype
+            if isinstance(tipo, pd.StringDtype):
+                columnas[col] = {"texto": f"string[{tipo.storage}]" if tipo.na_value is pd.NA else "str"}
+            else:
+                columnas[col] = {}
+    return arreglos, columnas
+
+
+def arreglo_mapeado(columna):
+    """NumPy sobre el memory map (sin copia) de una columna Arrow sin nulos."""
+    if columna.num_chunks == 1:
+        return columna.chunk(0).to_numpy(zero_copy_only=True)
+    return columna.to_numpy()
+
+
+def leer_compartido(ruta: Path) -> tuple[pd.DataFrame, dict, pd.Index]:
+    import pyarrow as pa
+
+    tabla = pa.ipc.open_file(pa.memory_map(str(ruta))).read_all()
+    etiquetas = json.loads(tabla.schema.metadata[b"etiquetas"])
+    columnas = json.loads(tabla.schema.metadata[b"columnas"])
+
+    # Cada columna se reconstruye encima de los buffers mapeados
+    datos = {}
+    for col, forma in columnas.items():
+        if "categorias" in forma:
+            tipo = pd.CategoricalDtype(pd.Index(forma["categorias"]))
+            datos[col] = pd.Categorical.from_codes(arreglo_mapeado(tabla.column(col)), dtype=tipo, validate=False)
+        elif "entero" in forma:
+            nulos = arreglo_mapeado(tabla.column(f"{col}.nulos")).view(bool)
+            datos[col] = pd.arrays.IntegerArray(arreglo_mapeado(tabla.column(col)), nulos)
+        elif "numpy" in forma:
+            datos[col] = arreglo_mapeado(tabla.column(col)).view(np.dtype(forma["numpy"]))
+        elif "texto" in forma:
+            tipo = pd.api.types.pandas_dtype(forma["texto"])
+            datos[col] = tabla.column(col).to_pandas(types_mapper=lambda _: tipo)
+        else:
+            datos[col] = tabla.column(col).to_pandas()
+    df = pd.DataFrame(datos, copy=False)
+
+    noticias = pa.ipc.open_file(pa.memory_map(str(ruta_noticias(ruta)))).read_all()
+    noticias = indice_noticias(noticias.column("NoticiaCriminal").to_pandas())
+    return df, etiquetas, noticias
+
+
+def frame_compartido() -> tuple[pd.DataFrame, dict, pd.Index, Path, Path]:
+    ruta = ruta_compartida()
+    COMPARTIDO_DIR.mkdir(exist_ok=True)
+    with bloqueo_archivo(ruta):
+        if not ruta.exists():
+            df, etiquetas, noticias, _ = preparar_frame()
+            print("💾 Guardando dataset compartido:", ruta)
+            escribir_compartido(df, etiquetas, noticias, ruta)
+            del df, noticias
+    print("🗺️ Abriendo dataset compartido (memory map):", ruta)
+    return (*leer_compartido(ruta), ruta_origen(), ruta)
+
+
+def vista(df: pd.DataFrame, mascara: pd.Series) -> pd.DataFrame:
+    """df[mascara]; si las filas son contiguas, un slice que no copia columnas."""
+    posiciones = np.flatnonzero(mascara.to_numpy(dtype=bool, na_value=False))
+    if len(posiciones) and posiciones[-1] - posiciones[0] + 1 == len(posiciones):
+        return df.iloc[posiciones[0]:posiciones[-1] + 1]
+    return df[mascara]
+
+
+def construir_datos() -> Datos:
+    _progreso.update(inicio=time.monotonic(), error=None)
+    avanzar("leyendo archivo")
+
+    df = compartido = None
+    if COMPARTIDO_ACTIVO:
+        try:
+            df, etiquetas, noticias, archivo, compartido = frame_compartido()
+        except (ImportError, OSError) as e:
+            print("⚠️ No se pudo usar el dataset compartido, se carga en este proceso:", e)
+    if df is None:
+        df, etiquetas, noticias, archivo = preparar_frame()
+
+    # ===============================
+    # VISTAS PRECALCULADAS (SOLO LECTURA)
+    # ===============================
+    avanzar("vistas y cubos")
+    final = vista(df, df["VersionFinalActual"] == 1)
+    preliminar = vista(df, df["EsVersionFinal"] == 0)
+    cubo_final = construir_cubo(final)
+    cubo_preliminar = construir_cubo(preliminar)
+
+    avanzar("indice")
+    indice = construir_indice(df)
+
+    return ensamblar(
+        df, final, preliminar, cubo_final, cubo_preliminar, indice, etiquetas, noticias, archivo, compartido
+    )
+
+
+def ensamblar(df, final, preliminar, cubo_final, cubo_preliminar, indice, etiquetas, noticias, archivo,
+              compartido=None) -> Datos:
+    """Completa la instantánea a partir del frame, sus vistas, cubos e índice."""
+    fecha_version = preliminar["FechaVersion"].max()
+    anio_final = int(final["AnoHecho"].max())
+    mes_version = int(fecha_version.month)
+    anio_version = int(fecha_version.year)
+
+    avanzar("territorios")
+    territorios = construir_territorios(
+        cubo_final, cubo_preliminar, anio_final, mes_version, anio_version, etiquetas
+    )
+
+    return Datos(
+        vigente=df,
+        final=final,
+        preliminar=preliminar,
+        cubo_final=cubo_final,
+        cubo_preliminar=cubo_preliminar,
+        indice=indice,
+        territorios=territorios,
+        etiquetas=etiquetas,
+        noticias=noticias,
+        anio_actual=int(df["AnoHecho"].max()),
+        anio_final=anio_final,
+        fecha_version=fecha_version,
+        mes_version=mes_version,
+        anio_version=anio_version,
+        version=version_dataset(df, archivo),
+        archivo=archivo,
+        compartido=compartido,
+    )
+
+
+def resumen(datos: Datos):
+    print("✅ DataFrame vigente cargado")
+    print("📊 Filas:", datos.vigente.shape[0])
+    print("🧊 Celdas del cubo:", len(datos.cubo_final) + len(datos.cubo_preliminar))
+    print("📅 Año actual:", datos.anio_actual)
+    print("🔖 Versión de datos:", datos.version)
+
+
+# La primera carga no ocurre al importar: main la lanza en segundo plano
+# (ver recargar_en_segundo_plano) para que el servidor responda /health
+# desde el arranque. Hasta entonces no hay instantánea publicada.
+_DATOS = None
+
+
+class DatosNoDisponibles(RuntimeError):
+    """Se pidió la instantánea antes de terminar la primera carga."""
+
+
+def listo() -> bool:
+    return _DATOS is not None
+
+
+# Instantánea fijada para el contexto actual (ej: un lote de consultas)
+_fijados: ContextVar = ContextVar("datos_fijados", default=None)
+
+
+def actual() -> Datos:
+    datos = _fijados.get() or _DATOS
+    if datos is None:
+        raise DatosNoDisponibles("Los datos todavía se están cargando")
+    return datos
+
+
+@contextmanager
+def fijar(datos: Datos):
+    """Dentro del bloque, actual() devuelve siempre `datos` aunque haya una recarga."""
+    token = _fijados.set(datos)
+    try:
+        yield datos
+    finally:
+        _fijados.reset(token)
+
+
+# ===============================
+# DELTA MENSUAL (INCREMENTAL)
+# ===============================
+def marcar_vigentes(filas: pd.DataFrame) -> np.ndarray:
+    """
+    Misma regla que ingesta.marcar_vigentes: VersionFinalActual = 1 solo en
+    la versión final más reciente de cada NumeroRadicadoInforme.
+    """
+    es_final = (filas["EsVersionFinal"] == 1).to_numpy(dtype=bool, na_value=False)
+    fecha = filas["FechaVersion"]
+    ultima = fecha.where(es_final).groupby(filas["NumeroRadicadoInforme"]).transform("max")
+    vigente = es_final & (fecha == ultima).to_numpy(dtype=bool, na_value=False)
+
+    sin_radicado = filas["NumeroRadicadoInforme"].isna().to_numpy()
+    anterior = filas["VersionFinalActual"].to_numpy(dtype=float, na_value=np.nan)
+    return np.where(sin_radicado, anterior, vigente.astype(float))
+
+
+def alinear_categorias(*frames: pd.DataFrame) -> list[pd.DataFrame]:
+    """Mismas categorías (unión, ordenada) en las columnas Categorical comunes."""
+    frames = list(frames)
+    columnas = [c for c in frames[0].columns if isinstance(frames[0][c].dtype, pd.CategoricalDtype)]
+    for col in columnas:
+        presentes = [f for f in frames if col in f.columns]
+        categorias = presentes[0][col].cat.categories
+        for f in presentes[1:]:
+            categorias = categorias.union(f[col].cat.categories)
+        for i, f in enumerate(frames):
+            if col in f.columns and not f[col].cat.categories.equals(categorias):
+                frames[i] = f.assign(**{col: f[col].cat.set_categories(categorias)})
+    return frames
+
+
+def aplicar_delta(base: Datos, delta: pd.DataFrame) -> Datos:
+    """
+    Instantánea nueva = `base` + filas del delta, sin reprocesar el histórico:
+    se normaliza solo el delta, se corrigen las banderas de vigencia de los
+    radicados que trae, los cubos se ajustan sumando/restando solo las filas
+    que entran o salen de cada vista y el índice solo indexa las filas nuevas.
+    """
+    viejo = base.vigente
+    delta, etiquetas = normalizar_frame(delta)
+
+    # Filas existentes de los radicados del delta (un registro conserva su
+    # AnoHecho entre versiones: solo se revisan esos años, vía el índice)
+    anios = [int(a) for a in delta["AnoHecho"].dropna().unique()]
+    candidatas = np.sort(np.concatenate([buscar(base.indice, "AnoHecho", a) for a in anios] + [VACIO]))
+    radicados = delta["NumeroRadicadoInforme"].dropna().unique()
+    en_delta = viejo["NumeroRadicadoInforme"].take(candidatas).isin(radicados)
+    afectadas = candidatas[en_delta.to_numpy(dtype=bool, na_value=False)].astype(np.int64)
+    anteriores = viejo.take(afectadas)
+
+    # Banderas de vigencia sobre las filas viejas y nuevas de esos radicados
+    columnas = ["NumeroRadicadoInforme", "FechaVersion", "EsVersionFinal", "VersionFinalActual"]
+    banderas = marcar_vigentes(pd.concat([anteriores[columnas], delta[columnas]], ignore_index=True))
+    delta["VersionFinalActual"] = pd.array(banderas[len(afectadas):], dtype="Float64").astype("Int8")
+
+    antes = anteriores["VersionFinalActual"].to_numpy(dtype=float, na_value=np.nan)
+    despues = banderas[:len(afectadas)]
+    cambia = antes != despues
+    apagadas = afectadas[cambia & (antes == 1)]
+    encendidas = afectadas[cambia & (despues == 1)]
+
+    # Identificadores: los radicados ya cargados conservan su código
+    mapa = anteriores.drop_duplicates("NumeroRadicadoInforme").set_index("NumeroRadicadoInforme")["IdRadicado"]
+    ids = mapa.reindex(delta["NumeroRadicadoInforme"]).to_numpy(dtype=float, na_value=np.nan, copy=True)
+    sin_id = np.isnan(ids) & delta["NumeroRadicadoInforme"].notna().to_numpy()
+    nuevos = factorizar_ids(delta["NumeroRadicadoInforme"][sin_id])
+    ids[sin_id] = nuevos + int(viejo["IdRadicado"].max()) + 1
+    delta["IdRadicado"] = np.nan_to_num(ids, nan=-1).astype(np.int64)
+
+    # Noticias: las ya cargadas (en cualquier año) conservan su código vía
+    # base.noticias; las nuevas continúan la numeración
+    ids = base.noticias.get_indexer(delta["NoticiaCriminal"]).astype(np.int64)
+    sin_id = (ids < 0) & delta["NoticiaCriminal"].notna().to_numpy()
+    nuevos, valores = factorizar_con_valores(delta["NoticiaCriminal"][sin_id])
+    ids[sin_id] = nuevos + len(base.noticias)
+    delta["IdNoticia"] = ids
+    noticias = base.noticias.append(indice_noticias(valores))
+    delta = compactar(delta.drop(columns="NoticiaCriminal"))
+
+    viejo, delta, cubo_final, cubo_preliminar = alinear_categorias(
+        viejo, delta, base.cubo_final, base.cubo_preliminar
+    )
+
+    # ===============================
+    # FRAME, VISTAS, CUBOS E ÍNDICE
+    # ===============================
+    vigente = pd.concat([viejo, delta], ignore_index=True)
+    bandera = vigente["VersionFinalActual"].copy()
+    bandera.iloc[afectadas[cambia]] = despues[cambia]
+    vigente["VersionFinalActual"] = bandera
+
+    final = vista(vigente, vigente["VersionFinalActual"] == 1)
+    preliminar = vista(vigente, vigente["EsVersionFinal"] == 0)
+
+    cubo_final = combinar(
+        cubo_final,
+        construir_cubo(delta[(delta["VersionFinalActual"] == 1).fillna(False)]),
+        construir_cubo(vigente.take(encendidas)),
+        restar=construir_cubo(vigente.take(apagadas)),
+    )
+    cubo_preliminar = combinar(
+        cubo_preliminar,
+        construir_cubo(delta[(delta["EsVersionFinal"] == 0).fillna(False)]),
+    )
+    indice = extender_indice(base.indice, delta, len(viejo))
+
+    print(f"🧩 Delta: {len(delta)} filas nuevas, {len(afectadas)} existentes revisadas, "
+          f"{int(cambia.sum())} banderas corregidas")
+    etiquetas = combinar_etiquetas(base.etiquetas, etiquetas)
+    return ensamblar(
+        vigente, final, preliminar, cubo_final, cubo_preliminar, indice, etiquetas, noticias, base.archivo
+    )
+
 
 # ===============================
-# DATAFRAME VIGENTE
+# RECARGA EN CALIENTE
 # ===============================
-#DF_VIGENTE = df[
- #   (df["EsVersionFinal"] == 0) &
-  #  (df["MesVersion"] == ULTIMO_MES_VERSION)
-#]
-DF_VIGENTE = df.copy()
+_lock_recarga = threading.Lock()
+
+# Funciones que reciben la instantánea nueva antes de publicarla (ej: precalcular)
+_preparadores = []
+
+
+def al_preparar(funcion):
+    _preparadores.append(funcion)
+
+
+# Funciones que reciben la instantánea recién publicada (ej: soltar lo de
+# versiones anteriores)
+_publicados = []
+
+
+def al_publicar(funcion):
+    _publicados.append(funcion)
+
+
+def publicar(nuevos: Datos):
+    global _DATOS
+    _DATOS = nuevos
+    for funcion in _publicados:
+        try:
+            funcion(nuevos)
+        except Exception as e:
+            print("⚠️ Error tras publicar la versión", nuevos.version, e)
+
+
+def _firma_archivos():
+    return tuple(
+        (p.name, *tamano_y_fecha(p))
+        for p in (PARQUET_PATH, CSV_PATH)
+        if p.exists()
+    )
+
+
+# Firma de los archivos de datos/ que corresponde a la última carga
+_firma_cargada = _firma_archivos()
+
+
+def recargar() -> bool:
+    """
+    Construye la nueva instantánea aparte y la publica con una sola
+    asignación. Las consultas en curso terminan con la anterior. También
+    hace la primera carga. Devuelve False si ya había una recarga en curso.
+    """
+    global _firma_cargada
+
+    if not _lock_recarga.acquire(blocking=False):
+        return False
+    try:
+        print("🔄 Recargando datos..." if listo() else "📂 Cargando datos...")
+        # Si la carga falla se conserva la versión anterior hasta el próximo
+        # cambio de archivos, en vez de reintentar en cada revisión
+        _firma_cargada = _firma_archivos()
+        nuevos = construir_datos()
+        for preparar in _preparadores:
+            preparar(nuevos)
+        publicar(nuevos)
+        _progreso.update(etapa="lista", paso=len(ETAPAS))
+        resumen(nuevos)
+        return True
+    except Exception as e:
+        _progreso["error"] = str(e)
+        print("❌ Error cargando datos, se mantienen los anteriores:", e)
+        return False
+    finally:
+        _lock_recarga.release()
+
+
+def ingerir(ruta_delta: Path) -> dict | None:
+    """
+    Agrega un delta mensual: lo escribe en el dataset particionado (ver
+    ingesta.py) y publica una instantánea derivada de la actual con
+    aplicar_delta(). Devuelve None si ya había una recarga en curso.
+    """
+    global _firma_cargada
+    import ingesta
+
+    base = actual()
+    if base.archivo != PARQUET_PATH or not PARQUET_PATH.is_dir():
+        raise ValueError("La ingesta incremental requiere el dataset Parquet particionado (convertir_parquet.py)")
+
+    if not _lock_recarga.acquire(blocking=False):
+        return None
+    recarga_completa = False
+    try:
+        print("🧩 Ingiriendo delta:", ruta_delta)
+        resultado = ingesta.agregar_particion(ruta_delta, PARQUET_PATH)
+        _firma_cargada = _firma_archivos()
+        try:
+            nuevos = aplicar_delta(base, leer_csv(ruta_delta))
+            for preparar in _preparadores:
+                preparar(nuevos)
+        except Exception:
+            # El delta ya está en disco: se publica con una recarga completa
+            recarga_completa = True
+            raise
+        publicar(nuevos)
+        resumen(nuevos)
+        return {**resultado, "version_datos": nuevos.version}
+    finally:
+        _lock_recarga.release()
+        if recarga_completa:
+            recargar_en_segundo_plano()
+
+
+def recargar_en_segundo_plano() -> bool:
+    """Lanza recargar() en un hilo; False si ya hay una recarga en curso."""
+    if _lock_recarga.locked():
+        return False
+    threading.Thread(target=recargar, name="recarga-datos", daemon=True).start()
+    return True
+
 
+def iniciar_vigilancia(intervalo: float):
+    """
+    Revisa cada `intervalo` segundos la fecha de modificación de los archivos
+    de datos/ y recarga cuando cambian. Espera a que la firma se repita en
+    dos revisiones seguidas para no leer un archivo a medio copiar.
+    """
+    def vigilar():
+        anterior = _firma_cargada
+        while True:
+            time.sleep(intervalo)
+            try:
+                firma = _firma_archivos()
+            except OSError:
+                continue
+            if firma != _firma_cargada and firma == anterior:
+                print("📂 Cambios detectados en", DATA_DIR)
+                recargar()
+            anterior = firma
 
-print("✅ DataFrame vigente cargado")
-print("📊 Filas:", DF_VIGENTE.shape[0])
-print("📅 Año actual:", ANIO_ACTUAL)
+    threading.Thread(target=vigilar, name="vigilancia-datos", daemon=True).start()
@@ -8,8 +8,11 @@ import unicodedata
 # NORMALIZACIÓN
 # ---------------------------------------------------------
 
+# Única implementación: la usan el intérprete y data_store (columnas del CSV)
 def normalizar(texto: str) -> str:
-    texto = texto.lower()
+    if not isinstance(texto, str):
+        return texto
+    texto = texto.lower().strip()
     texto = ''.join(
         c for c in unicodedata.normalize("NFD", texto)
         if unicodedata.category(c) != "Mn"
@@ -32,6 +35,32 @@ INTENCIONES = {
 }
 
 
+# ---------------------------------------------------------
+# AGRUPACIÓN ("por departamento") → plan["agrupar_por"]
+# ---------------------------------------------------------
+
+AGRUPACIONES = {
+    "Departamento": ["por departamento"],
+    "Municipio": ["por municipio", "por ciudad"],
+    "Sexo": ["por sexo", "por genero"],
+    "TipoVehiculo": ["por tipo de vehiculo", "por vehiculo"],
+    "ClaseAccidente": ["por clase de accidente", "por tipo de accidente"],
+    "Zona": ["por zona"],
+    "ActorVial": ["por actor vial", "por actor"],
+    "RangoEdad": ["por rango de edad", "por edad"]
+}
+
+
+# ---------------------------------------------------------
+# SERIES DE TIEMPO → plan["periodo"]
+# ---------------------------------------------------------
+
+SERIES = {
+    "mes": ["por mes", "mensual", "cada mes"],
+    "anio": ["por ano", "anual", "cada ano"]
+}
+
+
 # ---------------------------------------------------------
 # CONCEPTOS DE MUERTE / VÍCTIMAS
 # ---------------------------------------------------------
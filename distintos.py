@@ -0,0 +1,80 @@
+# =========================================================
+# CONTEO DE DISTINTOS SOBRE IDENTIFICADORES ENTEROS
+# =========================================================
+# data_store factoriza NumeroRadicadoInforme y NoticiaCriminal en códigos
+# int32 al cargar (-1 = nulo). Contar incidentes distintos por grupo se
+# reduce a ordenar una clave entera (grupo, id) y contar los cambios, sin
+# hashear cadenas.
+
+import numpy as np
+import pandas as pd
+
+# Columna de texto -> columna de códigos enteros
+IDENTIFICADORES = {
+    "NumeroRadicadoInforme": "IdRadicado",
+    "NoticiaCriminal": "IdNoticia",
+}
+
+
+def factorizar_con_valores(serie: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """Como factorizar_ids, y además el valor de cada código (valores[código])."""
+    codigos, valores = pd.factorize(serie)
+    tipo = np.int32 if len(valores) < np.iinfo(np.int32).max else np.int64
+    return codigos.astype(tipo, copy=False), valores
+
+
+def factorizar_ids(serie: pd.Series) -> np.ndarray:
+    """Códigos 0..n-1 por valor distinto; -1 para nulos."""
+    return factorizar_con_valores(serie)[0]
+
+
+def _codigos(serie: pd.Series):
+    """Códigos ordenados (-1 = nulo) y niveles de una columna de agrupación."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy(), serie.cat.categories
+    return pd.factorize(serie, sort=True)
+
+
+def contar_distintos(df: pd.DataFrame, columnas=None, ids: str = "IdRadicado"):
+    """
+    Equivalente a df.groupby(columnas, observed=True)[texto].nunique() usando
+    los códigos de `ids`. Sin columnas devuelve un int con el total de distintos.
+    """
+    codigos_id = df[ids].to_numpy()
+
+    if not columnas:
+        validos = np.sort(codigos_id[codigos_id >= 0])
+        return int(validos.size and 1 + np.count_nonzero(np.diff(validos)))
+
+    columnas = [columnas] if isinstance(columnas, str) else list(columnas)
+    codigos, niveles = zip(*(_codigos(df[c]) for c in columnas))
+    forma = tuple(max(len(n), 1) for n in niveles)
+    ancho = int(codigos_id.max()) + 2 if len(codigos_id) else 1
+
+    # La clave compuesta tiene que caber en int64
+    if np.prod(forma, dtype=float) * ancho >= 2 ** 63:
+        return df.groupby(columnas, observed=True)[ids].agg(lambda s: s[s >= 0].nunique())
+
+    # Filas con clave de grupo nula no forman grupo (como groupby)
+    con_grupo = np.logical_and.reduce([c >= 0 for c in codigos])
+    grupo = np.ravel_multi_index([c[con_grupo] for c in codigos], forma).astype(np.int64)
+
+    # id + 1 para que los nulos (0) ocupen un lugar pero no se cuenten
+    clave = np.sort(grupo * ancho + (codigos_id[con_grupo].astype(np.int64) + 1))
+    grupo = clave // ancho
+
+    nuevo_grupo = np.ones(len(clave), dtype=bool)
+    nuevo_grupo[1:] = grupo[1:] != grupo[:-1]
+    nuevo_id = np.ones(len(clave), dtype=bool)
+    nuevo_id[1:] = clave[1:] != clave[:-1]
+    cuenta = (nuevo_id & (clave % ancho != 0)).astype(np.int64)
+
+    inicios = np.flatnonzero(nuevo_grupo)
+    conteo = np.add.reduceat(cuenta, inicios) if len(inicios) else cuenta[:0]
+
+    posiciones = np.unravel_index(grupo[inicios], forma)
+    if len(columnas) == 1:
+        indice = niveles[0].take(posiciones[0]).rename(columnas[0])
+    else:
+        indice = pd.MultiIndex(levels=list(niveles), codes=list(posiciones), names=columnas)
+    return pd.Series(conteo, index=indice, name=ids)
@@ -2,40 +2,181 @@
 # EJECUTOR DE PLANES SEMÁNTICOS
 # =========================================================
 
-def ejecutar_plan(df, plan: dict) -> dict:
-    df_filtrado = df.copy()
+import numpy as np
+import pandas as pd
 
+from indice import buscar, clave, intersectar
+
+
+def filtrar_por_escaneo(df, columna, valor, filas):
+    """Filtro sobre una columna sin índice, evaluado solo en las filas candidatas."""
+    serie = df[columna].iloc[filas] if filas is not None else df[columna]
+
+    # 🔹 SOPORTE PARA RANGOS (ej: Año)
+    if isinstance(valor, dict) and "desde" in valor and "hasta" in valor:
+        mascara = (serie >= valor["desde"]) & (serie <= valor["hasta"])
+
+        mascara = mascara.to_numpy(dtype=bool, na_value=False)
+
+    # 🔹 FILTRO NORMAL (igualdad, con la misma normalización del índice)
+    else:
+        codigos, valores = pd.factorize(serie)
+        objetivo = clave(valor)
+        coincide = np.array([clave(v) == objetivo for v in valores] + [False])
+        mascara = coincide[codigos]
+
+    base = filas if filas is not None else np.arange(len(df))
+    return base[mascara]
+
+
+def resolver_filas(df, plan: dict, indice: dict | None = None):
+    """
+    Posiciones de las filas que cumplen los filtros del plan (None = todas).
+    Las columnas indexadas se resuelven intersectando posting lists; las
+    demás se evalúan solo sobre las filas que quedan.
+    """
+    indice = indice or {}
+    filtros = {
+        columna: valor
+        for columna, valor in plan.get("filtros", {}).items()
+        if columna in df.columns
+    }
+
+    indexados = [c for c in filtros if c in indice]
+    filas = intersectar([buscar(indice, c, filtros[c]) for c in indexados]) if indexados else None
+
+    for columna, valor in filtros.items():
+        if columna in indexados:
+            continue
+        filas = filtrar_por_escaneo(df, columna, valor, filas)
+
+    return filas
+
+
+def conteo_por_grupo(df, columna, filas):
+    """
+    Conteo de filas por valor de `columna` en una sola pasada: códigos del
+    factorize/Categorical + np.bincount. Devuelve una Series ordenada de
+    mayor a menor.
+    """
+    serie = df[columna]
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        codigos = serie.cat.codes.to_numpy()
+        etiquetas = serie.cat.categories
+    else:
+        codigos, etiquetas = pd.factorize(serie)
+
+    if filas is not None:
+        codigos = codigos[filas]
+    codigos = codigos[codigos >= 0]
+
+    conteo = pd.Series(np.bincount(codigos, minlength=len(etiquetas)), index=etiquetas)
+    conteo = conteo[conteo > 0]
+    return conteo.sort_values(ascending=False, kind="stable")
+
+
+def serie_temporal(df, periodo, filas):
+    """Conteo por año (periodo="anio") o por año y mes (periodo="mes")."""
+    anios = df["AnoHecho"].to_numpy(dtype="float64", na_value=np.nan)
+    if filas is not None:
+        anios = anios[filas]
+
+    if periodo == "mes":
+        meses = df["MesHecho"].to_numpy(dtype="float64", na_value=np.nan)
+        if filas is not None:
+            meses = meses[filas]
+        validos = ~(np.isnan(anios) | np.isnan(meses))
+        claves, conteos = np.unique(
+            anios[validos].astype(np.int64) * 100 + meses[validos].astype(np.int64),
+            return_counts=True,
+        )
+        return [
+            {"anio": int(k // 100), "mes": int(k % 100), "cantidad": int(n)}
+            for k, n in zip(claves, conteos)
+        ]
+
+    claves, conteos = np.unique(anios[~np.isnan(anios)].astype(np.int64), return_counts=True)
+    return [{"anio": int(k), "cantidad": int(n)} for k, n in zip(claves, conteos)]
+
+
+def porcentaje(parte, total):
+    return round(100 * parte / total, 2) if total else None
+
+
+def ejecutar_plan(df, plan: dict, indice: dict | None = None) -> dict:
+    """
+    Operaciones soportadas en plan["operacion"]:
+      COUNT    → número de filas que cumplen los filtros
+      PERCENT  → % de esas filas sobre las que cumplen solo los filtros de
+                 plan["base"] (por defecto ["AnoHecho"]); con
+                 plan["agrupar_por"] da la distribución % por grupo
+      GROUP_BY → conteo por plan["agrupar_por"], opcionalmente plan["top"]
+      SERIE    → conteo por plan["periodo"]: "mes" (por defecto) o "anio"
+    """
     # -------------------------
     # APLICAR FILTROS
     # -------------------------
-    for columna, valor in plan.get("filtros", {}).items():
-        if columna not in df_filtrado.columns:
-            continue
+    filas = resolver_filas(df, plan, indice)
+    total = len(df) if filas is None else int(len(filas))
 
-        # 🔹 SOPORTE PARA RANGOS (ej: Año)
-        if isinstance(valor, dict) and "desde" in valor and "hasta" in valor:
-            df_filtrado = df_filtrado[
-                (df_filtrado[columna] >= valor["desde"]) &
-                (df_filtrado[columna] <= valor["hasta"])
-            ]
-            continue
+    operacion = plan["operacion"]
+    agrupar_por = plan.get("agrupar_por")
+    top = plan.get("top")
 
-        # 🔹 FILTRO NORMAL (igualdad)
-        df_filtrado = df_filtrado[
-            df_filtrado[columna].astype(str).str.upper()
-            == str(valor).upper()
-        ]
+    if agrupar_por is not None and agrupar_por not in df.columns:
+        return {
+            "valor": None,
+            "mensaje": f"No se puede agrupar por {agrupar_por}"
+        }
 
     # -------------------------
     # OPERACIONES
     # -------------------------
-    if plan["operacion"] == "COUNT":
-        total = int(df_filtrado.shape[0])
+    if operacion == "COUNT":
         return {
             "valor": total,
             "filas_filtradas": total
         }
 
+    if operacion == "PERCENT" and agrupar_por is None:
+        base = plan.get("base", ["AnoHecho"])
+        plan_base = {
+            "filtros": {c: v for c, v in plan.get("filtros", {}).items() if c in base}
+        }
+        filas_base = resolver_filas(df, plan_base, indice)
+        total_base = len(df) if filas_base is None else int(len(filas_base))
+        return {
+            "valor": porcentaje(total, total_base),
+            "filas_filtradas": total,
+            "filas_base": total_base
+        }
+
+    if operacion in ("PERCENT", "GROUP_BY"):
+        if agrupar_por is None:
+            return {
+                "valor": None,
+                "mensaje": "Debe indicar la columna a agrupar"
+            }
+
+        conteo = conteo_por_grupo(df, agrupar_por, filas)
+        if top:
+            conteo = conteo.head(int(top))
+
+        grupos = [
+            {"grupo": str(g), "cantidad": int(n), "porcentaje": porcentaje(int(n), total)}
+            for g, n in conteo.items()
+        ]
+        return {
+            "valor": grupos,
+            "filas_filtradas": total
+        }
+
+    if operacion == "SERIE":
+        return {
+            "valor": serie_temporal(df, plan.get("periodo", "mes"), filas),
+            "filas_filtradas": total
+        }
+
     return {
         "valor": None,
         "mensaje": "Operación no soportada"
@@ -0,0 +1,68 @@
+# =========================================================
+# CALENDARIO DE FESTIVOS DE COLOMBIA
+# =========================================================
+# Se genera para cualquier año:
+#   - fijos: 1 ene, 1 may, 20 jul, 7 ago, 8 dic, 25 dic
+#   - Ley Emiliani (Ley 51 de 1983): se trasladan al lunes siguiente
+#   - dependientes de la Pascua: Jueves y Viernes Santo, y Ascensión,
+#     Corpus Christi y Sagrado Corazón (estos tres trasladados a lunes)
+
+from datetime import date, timedelta
+from functools import lru_cache
+
+import pandas as pd
+
+FIJOS = [(1, 1), (5, 1), (7, 20), (8, 7), (12, 8), (12, 25)]
+
+# Reyes, San José, San Pedro y San Pablo, Asunción, Día de la Raza,
+# Todos los Santos, Independencia de Cartagena
+EMILIANI = [(1, 6), (3, 19), (6, 29), (8, 15), (10, 12), (11, 1), (11, 11)]
+
+# Días respecto al domingo de Pascua
+PASCUA_SIN_TRASLADO = [-3, -2]      # Jueves y Viernes Santo
+PASCUA_CON_TRASLADO = [39, 60, 68]  # Ascensión, Corpus Christi, Sagrado Corazón
+
+
+def pascua(anio: int) -> date:
+    """Domingo de Pascua (algoritmo gregoriano anónimo / Meeus)."""
+    a = anio % 19
+    b, c = divmod(anio, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(anio, mes, dia + 1)
+
+
+def siguiente_lunes(fecha: date) -> date:
+    return fecha + timedelta(days=(7 - fecha.weekday()) % 7)
+
+
+@lru_cache(maxsize=None)
+def festivos_anio(anio: int) -> tuple:
+    domingo_pascua = pascua(anio)
+    dias = [date(anio, m, d) for m, d in FIJOS]
+    dias += [siguiente_lunes(date(anio, m, d)) for m, d in EMILIANI]
+    dias += [domingo_pascua + timedelta(days=n) for n in PASCUA_SIN_TRASLADO]
+    dias += [siguiente_lunes(domingo_pascua + timedelta(days=n)) for n in PASCUA_CON_TRASLADO]
+    return tuple(sorted(set(dias)))
+
+
+def calendario(anios) -> pd.DatetimeIndex:
+    return pd.DatetimeIndex(sorted(d for a in set(anios) for d in festivos_anio(int(a))))
+
+
+def marcar(fechas: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """
+    Banderas vectorizadas (EsFestivo, EsFinDeSemana) para una columna de
+    fechas; las fechas nulas quedan en False.
+    """
+    dias = fechas.dt.normalize()
+    anios = dias.dt.year.dropna().unique()
+    es_festivo = dias.isin(calendario(anios))
+    es_fin_de_semana = dias.dt.dayofweek >= 5  # 5=sábado,6=domingo
+    return es_festivo, es_fin_de_semana.fillna(False).astype(bool)
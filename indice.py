@@ -0,0 +1,102 @@
+# =========================================================
+# ÍNDICE INVERTIDO PARA FILTROS DE IGUALDAD
+# =========================================================
+# Para cada columna que puede emitir el intérprete se guarda, por valor
+# normalizado, el arreglo ordenado de posiciones de fila donde aparece.
+# Un plan con varios filtros se resuelve intersectando esos arreglos, sin
+# recorrer ni copiar el DataFrame.
+
+import numpy as np
+import pandas as pd
+
+from diccionarios import normalizar
+
+# Columnas que interprete.interpretar_pregunta puede poner en "filtros"
+COLUMNAS_INDICE = [
+    "AnoHecho", "Departamento", "EstadoVictima", "Sexo",
+    "TipoVehiculo", "ClaseAccidente", "Zona",
+]
+
+
+def clave(valor):
+    """Forma normalizada con la que se guarda y se busca un valor en el índice."""
+    if isinstance(valor, str):
+        texto = normalizar(valor)
+        # "2024" y 2024 deben encontrar lo mismo en AnoHecho
+        return int(texto) if texto.isdigit() else texto
+    if isinstance(valor, (int, np.integer)):
+        return int(valor)
+    if isinstance(valor, (float, np.floating)) and float(valor).is_integer():
+        return int(valor)
+    return valor
+
+
+def indexar_columna(serie: pd.Series) -> dict:
+    codigos, valores = pd.factorize(serie)
+    dtype = np.int32 if len(serie) < 2**31 else np.int64
+
+    validos = codigos >= 0
+    filas = np.flatnonzero(validos).astype(dtype)
+    codigos = codigos[validos]
+
+    # Agrupa las filas por código; el orden estable deja cada grupo ordenado
+    orden = np.argsort(codigos, kind="stable")
+    filas = filas[orden]
+    cortes = np.cumsum(np.bincount(codigos, minlength=len(valores)))[:-1]
+
+    postings = {}
+    for valor, parte in zip(valores, np.split(filas, cortes)):
+        k = clave(valor)
+        # Varios valores crudos pueden compartir la misma clave ("CAÍDA", "Caida")
+        postings[k] = np.union1d(postings[k], parte) if k in postings else parte
+    return postings
+
+
+def construir_indice(df: pd.DataFrame) -> dict:
+    return {col: indexar_columna(df[col]) for col in COLUMNAS_INDICE if col in df.columns}
+
+
+def extender_indice(indice: dict, nuevas: pd.DataFrame, desplazamiento: int) -> dict:
+    """
+    Índice de un frame al que se le agregaron `nuevas` filas al final (desde
+    la posición `desplazamiento`): solo se indexan las filas nuevas y sus
+    posiciones se añaden a las listas existentes, que siguen ordenadas.
+    """
+    dtype = np.int32 if desplazamiento + len(nuevas) < 2**31 else np.int64
+    extendido = {}
+    for columna, postings in indice.items():
+        combinados = dict(postings)
+        for k, filas in indexar_columna(nuevas[columna]).items():
+            filas = filas.astype(dtype) + desplazamiento
+            combinados[k] = np.concatenate([combinados[k], filas]) if k in combinados else filas
+        extendido[columna] = combinados
+    return extendido
+
+
+VACIO = np.array([], dtype=np.int64)
+
+
+def buscar(indice: dict, columna: str, valor) -> np.ndarray:
+    """Posiciones de fila que cumplen el filtro (igualdad o rango desde/hasta)."""
+    postings = indice[columna]
+
+    if isinstance(valor, dict) and "desde" in valor and "hasta" in valor:
+        desde, hasta = clave(valor["desde"]), clave(valor["hasta"])
+        partes = [
+            filas for k, filas in postings.items()
+            if isinstance(k, int) and desde <= k <= hasta
+        ]
+        return np.sort(np.concatenate(partes)) if partes else VACIO
+
+    return postings.get(clave(valor), VACIO)
+
+
+def intersectar(listas) -> np.ndarray:
+    """Intersección de arreglos ordenados, empezando por el más corto."""
+    listas = sorted(listas, key=len)
+    resultado = listas[0]
+    for filas in listas[1:]:
+        if len(resultado) == 0:
+            break
+        resultado = np.intersect1d(resultado, filas, assume_unique=True)
+    return resultado
@@ -0,0 +1,181 @@
+# =========================================================
+# INGESTA INCREMENTAL DE UNA VERSIÓN MENSUAL (DELTA)
+# =========================================================
+# Agrega al dataset particionado (ver convertir_parquet.py) solo el CSV con
+# los registros nuevos del mes, sin regenerar el resto:
+#
+#   1. Cada partición AnoHecho del delta recibe un archivo
+#      delta-<fecha>-<hash del CSV>.parquet; el mismo delta no se ingiere dos
+#      veces y dos deltas distintos nunca comparten nombre.
+#   2. Se recalcula VersionFinalActual solo para los NumeroRadicadoInforme
+#      que trae el delta (regla de marcar_vigentes) y se reescriben solo los
+#      archivos donde alguna bandera cambió. Un registro conserva su AnoHecho
+#      entre versiones, así que basta con leer las particiones de esos años.
+#
+# Con el servidor en marcha se usa POST /admin/ingerir, que además actualiza
+# en memoria vistas, cubos e índice (data_store.ingerir). Desde la línea de
+# comandos solo se escribe el dataset; el servidor lo recarga completo.
+#
+# Uso:
+#   python ingesta.py RUTA_DELTA.csv [--dataset RUTA]
+
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import polars as pl
+
+from convertir_parquet import ORDEN, PARQUET_PATH, a_utf8, carpeta_particion, escanear
+
+
+def marcar_vigentes(df: pl.DataFrame) -> pl.DataFrame:
+    """
+    VersionFinalActual = 1 en las filas de la versión final más reciente
+    (mayor FechaVersion con EsVersionFinal = 1) de cada NumeroRadicadoInforme;
+    0 en las demás. Filas sin radicado conservan su bandera.
+    """
+    fecha = pl.col("FechaVersion").cast(pl.Utf8).str.to_datetime(strict=False)
+    es_final = pl.col("EsVersionFinal") == 1
+    ultima = fecha.filter(es_final).max().over("NumeroRadicadoInforme")
+    vigente = (es_final & (fecha == ultima)).fill_null(False)
+
+    tipo = df.schema["VersionFinalActual"]
+    return df.with_columns(
+        pl.when(pl.col("NumeroRadicadoInforme").is_null())
+        .then(pl.col("VersionFinalActual"))
+        .otherwise(vigente.cast(tipo))
+        .alias("VersionFinalActual")
+    )
+
+
+def columnas_particion(dataset: Path) -> list[str]:
+    """Claves de partición del dataset: AnoHecho y, si existe, MesVersion."""
+    return ["AnoHecho", "MesVersion"] if any(dataset.glob("AnoHecho=*/MesVersion=*")) else ["AnoHecho"]
+
+
+def escribir(df: pl.DataFrame, ruta: Path, nuevo: bool = False):
+    """
+    Mismas opciones que convertir_parquet; reemplazo atómico. Con nuevo=True
+    falla (FileExistsError) si `ruta` ya existe en vez de sobrescribirla.
+    """
+    temporal = ruta.with_suffix(".tmp")
+    df.write_parquet(temporal, compression="zstd", statistics=True, row_group_size=128_000)
+    if nuevo:
+        try:
+            os.link(temporal, ruta)
+        finally:
+            os.unlink(temporal)
+    else:
+        os.replace(temporal, ruta)
+
+
+def huella(ruta: Path) -> str:
+    """Hash del contenido del CSV: identifica el delta en los nombres de archivo."""
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(bloque)
+    return h.hexdigest()[:16]
+
+
+def agregar_particion(ruta_delta: Path, dataset: Path = PARQUET_PATH,
+                      codificacion: str = "latin-1") -> dict:
+    if not dataset.is_dir():
+        raise ValueError(f"{dataset} no es un dataset particionado; ejecute convertir_parquet.py primero")
+
+    particiones = columnas_particion(dataset)
+    archivos = sorted(dataset.rglob("*.parquet"))
+
+    firma = huella(ruta_delta)
+    if any(dataset.rglob(f"delta-*-{firma}.parquet")):
+        raise ValueError(f"El delta {ruta_delta.name} ya fue ingerido (huella {firma})")
+    esquema = pl.read_parquet_schema(archivos[0])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_utf8 = Path(tmp) / "delta.csv"
+        a_utf8(ruta_delta, csv_utf8, codificacion)
+        # El delta es pequeño: se lee completo y con los tipos del dataset
+        delta = escanear(csv_utf8).collect()
+
+    delta = delta.with_columns(
+        pl.col(c).cast(tipo) for c, tipo in esquema.items() if c in delta.columns
+    ).select([c for c in esquema if c in delta.columns] + particiones)
+
+    # Filas existentes de los radicados del delta (solo en los años del delta)
+    radicados = delta["NumeroRadicadoInforme"].drop_nulls().unique()
+    existentes = []
+    for anio in delta["AnoHecho"].drop_nulls().unique().to_list():
+        for archivo in sorted((dataset / f"AnoHecho={anio}").rglob("*.parquet")):
+            filas = (
+                pl.read_parquet(archivo, hive_partitioning=False)
+                .with_row_index("_fila")
+                .filter(pl.col("NumeroRadicadoInforme").is_in(radicados.implode()))
+            )
+            if len(filas):
+                existentes.append(filas.with_columns(pl.lit(str(archivo)).alias("_archivo")))
+
+    # Regla de vigencia sobre viejas + nuevas de esos radicados
+    columnas = ["NumeroRadicadoInforme", "FechaVersion", "EsVersionFinal", "VersionFinalActual"]
+    viejas = (
+        pl.concat([e.select(["_archivo", "_fila"] + columnas) for e in existentes])
+        if existentes else None
+    )
+    nuevas = delta.with_columns(pl.lit(None, pl.Utf8).alias("_archivo"), pl.lit(None, pl.UInt32).alias("_fila"))
+    todas = pl.concat([viejas, nuevas.select(["_archivo", "_fila"] + columnas)]) if viejas is not None \
+        else nuevas.select(["_archivo", "_fila"] + columnas)
+    marcadas = marcar_vigentes(todas)
+
+    # 1. Archivos existentes donde alguna bandera cambió
+    cambios = (
+        marcadas.filter(pl.col("_archivo").is_not_null())
+        .join(todas.select("_archivo", "_fila", pl.col("VersionFinalActual").alias("_antes")),
+              on=["_archivo", "_fila"])
+        .filter(pl.col("VersionFinalActual") != pl.col("_antes"))
+    )
+    for (archivo,), grupo in cambios.group_by("_archivo"):
+        df = pl.read_parquet(archivo, hive_partitioning=False).with_row_index("_fila")
+        df = (
+            df.join(grupo.select("_fila", pl.col("VersionFinalActual").alias("_nueva")), on="_fila", how="left")
+            .with_columns(pl.coalesce("_nueva", "VersionFinalActual").alias("VersionFinalActual"))
+            .drop("_fila", "_nueva")
+        )
+        escribir(df, Path(archivo))
+
+    # 2. Filas del delta como archivos nuevos de cada partición
+    delta = delta.with_columns(marcadas.filter(pl.col("_archivo").is_null())["VersionFinalActual"])
+    orden = [c for c in ORDEN if c in delta.columns]
+    nombre = f"delta-{time.strftime('%Y%m%d%H%M%S')}-{firma}.parquet"
+    for clave in delta.select(particiones).unique().to_dicts():
+        filtro = pl.lit(True)
+        for col, valor in clave.items():
+            filtro &= pl.col(col).is_null() if valor is None else pl.col(col) == valor
+        destino = carpeta_particion(dataset, clave)
+        destino.mkdir(parents=True, exist_ok=True)
+        parte = delta.filter(filtro).drop(particiones).sort(orden, nulls_last=True)
+        escribir(parte, destino / nombre, nuevo=True)
+
+    return {
+        "filas_agregadas": len(delta),
+        "radicados_afectados": len(radicados),
+        "banderas_corregidas": len(cambios),
+        "archivos_reescritos": cambios["_archivo"].n_unique() if len(cambios) else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agrega el delta mensual al dataset Parquet particionado")
+    parser.add_argument("delta", type=Path, help="CSV con los registros nuevos (mismo formato que MLrefinado.csv)")
+    parser.add_argument("--dataset", type=Path, default=PARQUET_PATH)
+    parser.add_argument("--codificacion", default="latin-1")
+    args = parser.parse_args()
+
+    print("📥 Ingiriendo delta:", args.delta)
+    resultado = agregar_particion(args.delta, args.dataset, args.codificacion)
+    print("✅", resultado)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,8 @@ import re
 from .diccionario_semantico import (
     normalizar,
     INTENCIONES,
+    AGRUPACIONES,
+    SERIES,
     ESTADO_VICTIMA,
     SEXO,
     TIPO_VEHICULO,
@@ -69,6 +71,24 @@ def interpretar_pregunta(pregunta: str) -> dict:
             plan["operacion"] = operacion
             break
 
+    # -------------------------
+    # AGRUPACIÓN / TOP-N / SERIE
+    # -------------------------
+    agrupar = buscar_en_diccionario(texto, AGRUPACIONES)
+    if agrupar:
+        plan["agrupar_por"] = agrupar
+        if plan["operacion"] == "COUNT":
+            plan["operacion"] = "GROUP_BY"
+
+        top = re.search(r"\b(?:top|los|las|primeros|primeras)\s+(\d{1,2})\b", texto)
+        if top:
+            plan["top"] = int(top.group(1))
+
+    periodo = buscar_en_diccionario(texto, SERIES)
+    if periodo and plan["operacion"] == "COUNT":
+        plan["operacion"] = "SERIE"
+        plan["periodo"] = periodo
+
     # -------------------------
     # AÑO
     # -------------------------
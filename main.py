@@ -1,40 +1,109 @@
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI(title="API Siniestralidad Vial")
+import data_store
+import procesos
+from respuestas import RespuestaJSON
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Recarga en caliente al cambiar los archivos de datos/ (0 = desactivada)
+VIGILANCIA_DATOS_SEG = float(os.environ.get("VIGILANCIA_DATOS_SEG", "60"))
+
+# Segundos sugeridos en Retry-After mientras los datos no están listos
+REINTENTAR_SEG = os.environ.get("REINTENTAR_SEG", "5")
 
-@app.get("/")
-def root():
-    return {"status": "backend OK"}
 
 # ===============================
-# DATA (SE CARGA UNA SOLA VEZ)
+# DATA (SE CARGA EN SEGUNDO PLANO)
 # ===============================
-from data_store import DF_VIGENTE, ANIO_ACTUAL
+# El servidor acepta conexiones de inmediato: /health responde desde el
+# arranque y /consulta/* devuelve 503 hasta que termina la primera carga.
+@asynccontextmanager
+async def lifespan(app):
+    data_store.recargar_en_segundo_plano()
+    if VIGILANCIA_DATOS_SEG > 0:
+        data_store.iniciar_vigilancia(VIGILANCIA_DATOS_SEG)
+    yield
+    procesos.cerrar()
+
 
-print(f"📊 Registros vigentes cargados: {DF_VIGENTE.shape[0]}")
-print(f"📅 Año más reciente: {ANIO_ACTUAL}")
+app = FastAPI(
+    title="API Siniestralidad Vial",
+    default_response_class=RespuestaJSON,
+    lifespan=lifespan,
+)
+
+@app.get("/")
+def root():
+    return {"status": "backend OK"}
 
 # ===============================
 # ROUTERS
 # ===============================
 from consultas_fijas import router as router_fijas
+from consulta_sql import router as router_sql
+from admin import router as router_admin
 app.include_router(router_fijas, prefix="/consulta", tags=["Consultas Fijas"])
+app.include_router(router_sql, prefix="/consulta", tags=["Consultas SQL"])
+app.include_router(router_admin, prefix="/admin", tags=["Administración"])
+
+# Q01–Q29 pre-serializadas en memoria (se recalculan en cada recarga)
+if os.environ.get("PRECALCULAR_CONSULTAS", "0") == "1":
+    import precalculo
+    precalculo.activar(app)
+
+# ETag / Last-Modified / 304 en GET /consulta/* (antes de la precalculada)
+import cache_http
+cache_http.activar(app)
+
+# Registrado al final para que envuelva también a la precalculada
+@app.middleware("http")
+async def esperar_datos(request, call_next):
+    if request.url.path.startswith("/consulta") and not data_store.listo():
+        return RespuestaJSON(
+            {"detail": "Datos en carga", **data_store.progreso()},
+            status_code=503,
+            headers={"Retry-After": REINTENTAR_SEG},
+        )
+    return await call_next(request)
+
+# CORS registrado el último: Starlette deja como más externo al último
+# middleware, así también llevan las cabeceras las respuestas precalculadas,
+# los 304 y los 503 de arriba
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["*"],
+    allow_headers=["*"],
+    # Legibles desde el navegador en peticiones cross-origin
+    expose_headers=["Retry-After", "ETag"],
+)
 
 # ===============================
 # HEALTHCHECK
 # ===============================
+# Liveness: el proceso responde, haya o no datos cargados
 @app.get("/health")
 def health():
+    return {"status": "ok", "datos_listos": data_store.listo()}
+
+
+# Readiness: 200 solo cuando hay datos publicados; mientras tanto, el progreso
+@app.get("/ready")
+def ready():
+    if not data_store.listo():
+        return RespuestaJSON(
+            {"status": "cargando", **data_store.progreso()},
+            status_code=503,
+            headers={"Retry-After": REINTENTAR_SEG},
+        )
+
+    datos = data_store.actual()
     return {
         "status": "ok",
-        "filas_vigentes": int(DF_VIGENTE.shape[0]),
-        "anio_actual": ANIO_ACTUAL
+        "filas_vigentes": int(datos.vigente.shape[0]),
+        "anio_actual": datos.anio_actual,
+        "version_datos": datos.version
     }
@@ -0,0 +1,96 @@
+# =========================================================
+# CONSULTAS FIJAS PRE-SERIALIZADAS (OPCIONAL)
+# =========================================================
+# Con PRECALCULAR_CONSULTAS=1 las Q01–Q29 se calculan en la carga inicial y
+# en cada recarga (antes de publicar los datos nuevos) y se guardan como
+# bytes JSON, opcionalmente también comprimidos con gzip. Las peticiones
+# GET /consulta/Qxx se responden directamente desde memoria.
+
+import gzip
+import os
+import threading
+
+from fastapi.responses import Response
+
+import data_store
+from respuestas import a_json
+
+PREFIJO = "/consulta/"
+GZIP_ACTIVO = os.environ.get("PRECALCULO_GZIP", "1") == "1"
+
+# version_datos -> {"Q01": (json, json_gzip | None), ...}
+_respuestas = {}
+_lock = threading.Lock()
+
+
+def precalcular(datos):
+    from consultas_fijas import CONSULTAS
+
+    respuestas = {}
+    with data_store.fijar(datos):
+        for id_consulta, consulta in CONSULTAS.items():
+            # __wrapped__: se calcula sin pasar por la caché de resultados.
+            # Una consulta que falla no impide publicar los datos: queda sin
+            # precalcular y se resuelve en cada petición
+            try:
+                resultado = consulta.__wrapped__()
+            except Exception as e:
+                print(f"⚠️ {id_consulta} no se pudo precalcular:", e)
+                continue
+            cuerpo = a_json(resultado)
+            comprimido = gzip.compress(cuerpo, compresslevel=6) if GZIP_ACTIVO else None
+            respuestas[id_consulta] = (cuerpo, comprimido)
+
+    publicada = data_store.actual().version if data_store.listo() else None
+    with _lock:
+        _respuestas[datos.version] = respuestas
+        # Solo se conservan la versión publicada y la que se está preparando
+        for version in list(_respuestas):
+            if version not in (datos.version, publicada):
+                del _respuestas[version]
+
+    print(f"📦 Consultas pre-serializadas: {len(respuestas)} (versión {datos.version})")
+
+
+def soltar_anteriores(datos):
+    """Ya publicada la versión nueva, las respuestas de la anterior sobran."""
+    with _lock:
+        for version in list(_respuestas):
+            if version != datos.version:
+                del _respuestas[version]
+
+
+def respuesta_guardada(id_consulta: str, acepta_gzip: bool):
+    if not data_store.listo():
+        return None
+    with _lock:
+        guardadas = _respuestas.get(data_store.actual().version)
+    if not guardadas or id_consulta not in guardadas:
+        return None
+
+    cuerpo, comprimido = guardadas[id_consulta]
+    if acepta_gzip and comprimido is not None:
+        return Response(
+            content=comprimido,
+            media_type="application/json",
+            headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"},
+        )
+    return Response(content=cuerpo, media_type="application/json")
+
+
+def activar(app):
+    """Precalcula en cada carga de datos y atiende /consulta/Qxx desde memoria."""
+    if data_store.listo():
+        precalcular(data_store.actual())
+    data_store.al_preparar(precalcular)
+    data_store.al_publicar(soltar_anteriores)
+
+    @app.middleware("http")
+    async def servir_precalculadas(request, call_next):
+        ruta = request.url.path
+        if request.method == "GET" and ruta.startswith(PREFIJO):
+            acepta_gzip = "gzip" in request.headers.get("accept-encoding", "")
+            respuesta = respuesta_guardada(ruta[len(PREFIJO):], acepta_gzip)
+            if respuesta is not None:
+                return respuesta
+        return await call_next(request)
@@ -0,0 +1,126 @@
+# =========================================================
+# CONSULTAS PESADAS EN UN POOL DE PROCESOS (OPCIONAL)
+# =========================================================
+# Los handlers Qxx son funciones síncronas que corren en el threadpool de
+# Starlette; sus groupby y operaciones de texto de pandas retienen el GIL,
+# así que varias peticiones concurrentes a las consultas pesadas se
+# ejecutan de a una. Con PROCESOS_CONSULTAS=N las funciones marcadas con
+# @en_proceso se resuelven en N procesos hijos; las demás siguen en hilo.
+#
+# Los hijos se crean con fork justo después de preparar cada versión de
+# datos (hook al_preparar): heredan la instantánea copy-on-write, sin
+# copiarla ni serializarla. Cada recarga crea un pool nuevo y el de la
+# versión anterior se cierra al publicar la nueva (hook al_publicar). Solo
+# viaja entre procesos el nombre de la consulta (ida) y el resultado (vuelta).
+#
+# Requiere fork (Linux/macOS); en otras plataformas queda desactivado.
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import wraps
+
+import data_store
+
+PROCESOS_CONSULTAS = int(os.environ.get("PROCESOS_CONSULTAS", "0"))
+
+ACTIVO = PROCESOS_CONSULTAS > 0 and "fork" in multiprocessing.get_all_start_methods()
+if PROCESOS_CONSULTAS > 0 and not ACTIVO:
+    print("⚠️ PROCESOS_CONSULTAS requiere fork; las consultas se ejecutan en hilos")
+
+# nombre -> función sin decorar (los hijos la heredan con el fork)
+_funciones = {}
+
+# version_datos -> ProcessPoolExecutor con esa versión cargada
+_pools = {}
+_lock = threading.Lock()
+
+# Instantánea de este proceso hijo (ver _iniciar_hijo)
+_datos_hijo = None
+
+
+def en_proceso(func):
+    """Marca una consulta pesada: con el pool activo se ejecuta en un proceso hijo."""
+    # Con el backend polars la consulta ya usa varios hilos sin el GIL (y
+    # Polars no admite fork una vez iniciado su pool de hilos)
+    if not ACTIVO or func.__module__ == "consultas_polars":
+        return func
+    _funciones[func.__name__] = func
+
+    @wraps(func)
+    def wrapper():
+        with _lock:
+            pool = _pools.get(data_store.actual().version)
+        if pool is None:
+            return func()
+        return pool.submit(_ejecutar, func.__name__).result()
+
+    return wrapper
+
+
+def _iniciar_hijo(datos):
+    global _datos_hijo
+    # Con fork, `datos` llega por herencia de memoria, no serializado
+    _datos_hijo = datos
+
+    # El hijo no hereda la caché del padre: su lock pudo quedar tomado por
+    # otro hilo en el momento del fork
+    import cache_resultados
+    cache_resultados.CACHE = cache_resultados.CacheResultados()
+
+
+def _ejecutar(nombre):
+    with data_store.fijar(_datos_hijo):
+        return _funciones[nombre]()
+
+
+def preparar(datos):
+    """Hook al_preparar: pool nuevo para `datos`, creado antes de publicarlos."""
+    pool = ProcessPoolExecutor(
+        max_workers=PROCESOS_CONSULTAS,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_iniciar_hijo,
+        initargs=(datos,),
+    )
+    # El primer envío lanza todos los hijos: el fork ocurre aquí, en el hilo
+    # de carga, y no en medio de una petición
+    pool.submit(os.getpid).result()
+
+    publicada = data_store.actual().version if data_store.listo() else None
+    with _lock:
+        # Hasta publicar conviven la versión publicada y la que se prepara
+        # (una recarga sin cambios reemplaza el pool de su misma versión;
+        # también se cierra el de una preparación anterior que falló)
+        sobrantes = [_pools.pop(v) for v in list(_pools) if v == datos.version or v != publicada]
+        _pools[datos.version] = pool
+    _soltar(sobrantes)
+
+    print(f"🧵 Pool de consultas: {PROCESOS_CONSULTAS} procesos (versión {datos.version})")
+
+
+def soltar_anteriores(datos):
+    """Hook al_publicar: cierra los pools de las demás versiones."""
+    with _lock:
+        sobrantes = [_pools.pop(v) for v in list(_pools) if v != datos.version]
+    _soltar(sobrantes)
+
+
+def _soltar(pools):
+    for pool in pools:
+        # Sin cancelar: las consultas ya enviadas terminan antes de salir.
+        # Al soltar el pool se suelta también la instantánea de sus initargs
+        pool.shutdown(wait=False)
+
+
+def cerrar():
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+if ACTIVO:
+    data_store.al_preparar(preparar)
+    data_store.al_publicar(soltar_anteriores)
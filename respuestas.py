@@ -0,0 +1,89 @@
+# =========================================================
+# RESPUESTAS JSON (orjson, con soporte NumPy / pandas)
+# =========================================================
+# Las consultas pueden devolver directamente Series, DataFrames y escalares
+# de NumPy: se serializan aquí sin pasar por jsonable_encoder.
+
+import asyncio
+import base64
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import wraps
+
+import numpy as np
+import orjson
+import pandas as pd
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
+
+OPCIONES = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def clave_json(k):
+    if isinstance(k, (datetime, date)):
+        return k.isoformat()
+    if isinstance(k, np.generic):
+        k = k.item()
+    return k if isinstance(k, (str, int, float, bool)) or k is None else str(k)
+
+
+def convertir(obj):
+    """`default` de orjson para los tipos que no serializa por sí mismo."""
+    # Series → {índice: valor}; DataFrame → {columna: {índice: valor}}
+    # (misma orientación que .to_dict())
+    if isinstance(obj, pd.Series):
+        return dict(zip(map(clave_json, obj.index), obj.tolist()))
+    if isinstance(obj, pd.DataFrame):
+        return {clave_json(c): convertir(obj[c]) for c in obj.columns}
+    if isinstance(obj, pd.Index):
+        return obj.tolist()
+    if isinstance(obj, (pd.Timestamp, datetime, date)):
+        return obj.isoformat()
+    # Duraciones (ej: INTERVAL de DuckDB) en ISO 8601: "P3DT0H5M0S"
+    if isinstance(obj, (timedelta, np.timedelta64)):
+        duracion = pd.Timedelta(obj)
+        return None if duracion is pd.NaT else duracion.isoformat()
+    # BLOB: JSON no tiene binario
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return base64.b64encode(obj).decode("ascii")
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if obj is pd.NA or obj is pd.NaT:
+        return None
+    raise TypeError(f"Tipo no serializable a JSON: {type(obj).__name__}")
+
+
+def a_json(contenido) -> bytes:
+    return orjson.dumps(contenido, default=convertir, option=OPCIONES)
+
+
+class RespuestaJSON(JSONResponse):
+    def render(self, content) -> bytes:
+        return a_json(content)
+
+
+def responder_json(endpoint):
+    """Envuelve el endpoint para que su resultado salga como RespuestaJSON."""
+    if asyncio.iscoroutinefunction(endpoint):
+        @wraps(endpoint)
+        async def envoltura(*args, **kwargs):
+            resultado = await endpoint(*args, **kwargs)
+            return resultado if isinstance(resultado, Response) else RespuestaJSON(resultado)
+    else:
+        @wraps(endpoint)
+        def envoltura(*args, **kwargs):
+            resultado = endpoint(*args, **kwargs)
+            return resultado if isinstance(resultado, Response) else RespuestaJSON(resultado)
+    return envoltura
+
+
+class RutaJSON(APIRoute):
+    """
+    Ruta que entrega el resultado del endpoint a RespuestaJSON. FastAPI aplica
+    jsonable_encoder a todo lo que no sea un Response, aunque se cambie la
+    response_class; devolviendo el Response desde la ruta se evita ese paso.
+    """
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, responder_json(endpoint), **kwargs)
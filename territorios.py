@@ -0,0 +1,95 @@
+# =========================================================
+# AGREGADOS POR TERRITORIO (DEPARTAMENTO / MUNICIPIO)
+# =========================================================
+# Se calculan una vez por instantánea de datos, a partir de los cubos, para
+# todos los departamentos y municipios a la vez. Consultar un territorio
+# es una búsqueda en diccionario.
+
+import pandas as pd
+
+from comparacion import ACTUAL, ANTERIOR, comparar, tendencia
+
+
+def _agregar(cubo_final, cubo_preliminar, anio_final, mes_version, anio_version):
+    """Una fila por (Departamento, Municipio) con totales y variación; Municipio puede ser nulo."""
+    claves = ["Departamento", "Municipio"]
+
+    final = cubo_final[cubo_final["AnoHecho"] == anio_final]
+    estados = (
+        final.groupby(claves + ["EstadoVictima"], observed=True, dropna=False)["registros"]
+        .sum()
+        .unstack("EstadoVictima", fill_value=0)
+    )
+    conteos = pd.DataFrame({
+        "total": estados.sum(axis=1),
+        "muertos": estados.get("muertos", 0),
+        "lesionados": estados.get("lesionados", 0),
+    })
+
+    muertes = comparar(
+        cubo_preliminar, anio_version, mes_version, claves, dropna=False, EstadoVictima="muertos"
+    )
+    muertes = muertes[[ACTUAL, ANTERIOR]].rename(
+        columns={ACTUAL: "muertes_actual", ANTERIOR: "muertes_anterior"}
+    )
+
+    # Unión externa: hay territorios que solo aparecen en la versión preliminar
+    return conteos.join(muertes, how="outer").fillna(0).astype(int)
+
+
+def _ficha(fila, anio_final, mes_version, anio_version) -> dict:
+    variacion = int(fila["muertes_actual"] - fila["muertes_anterior"])
+    return {
+        "anio": anio_final,
+        "total": int(fila["total"]),
+        "muertos": int(fila["muertos"]),
+        "lesionados": int(fila["lesionados"]),
+        "variacion_muertes": {
+            "anio_actual": anio_version,
+            "anio_anterior": anio_version - 1,
+            "mes": mes_version,
+            "muertes_anterior": int(fila["muertes_anterior"]),
+            "muertes_actual": int(fila["muertes_actual"]),
+            "variacion": variacion,
+            "tendencia": tendencia(variacion),
+        },
+    }
+
+
+def construir_territorios(cubo_final, cubo_preliminar, anio_final, mes_version, anio_version,
+                          etiquetas: dict) -> dict:
+    """
+    {"departamentos": {depto: ficha},
+     "municipios": {(depto, muni): ficha},
+     "municipio_a_departamentos": {muni: [depto, ...]}}
+    con nombres canónicos (normalizados) como claves; las fichas llevan la
+    etiqueta de presentación (ver data_store.normalizar_serie).
+    """
+    conteos = _agregar(cubo_final, cubo_preliminar, anio_final, mes_version, anio_version)
+    args = (anio_final, mes_version, anio_version)
+    nombre_depto = etiquetas.get("Departamento", {})
+    nombre_muni = etiquetas.get("Municipio", {})
+
+    por_depto = conteos.groupby(level="Departamento", observed=True).sum()
+    departamentos = {
+        depto: {"departamento": nombre_depto.get(depto, depto.upper()), **_ficha(fila, *args)}
+        for depto, fila in por_depto.iterrows()
+    }
+
+    municipios = {}
+    municipio_a_departamentos = {}
+    for (depto, muni), fila in conteos.iterrows():
+        if pd.isna(depto) or pd.isna(muni):
+            continue
+        municipios[(depto, muni)] = {
+            "municipio": nombre_muni.get(muni, muni.upper()),
+            "departamento": nombre_depto.get(depto, depto.upper()),
+            **_ficha(fila, *args),
+        }
+        municipio_a_departamentos.setdefault(muni, []).append(depto)
+
+    return {
+        "departamentos": departamentos,
+        "municipios": municipios,
+        "municipio_a_departamentos": municipio_a_departamentos,
+    }
@@ -0,0 +1,43 @@
+# Dataset particionado con claves nulas (AnoHecho=__HIVE_DEFAULT_PARTITION__):
+# data_store lo lee como Parquet, sin volver al CSV.
+
+from datetime import date
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pyarrow")
+pytest.importorskip("polars")
+
+import convertir_parquet
+import data_store
+from tests.test_ingesta import escribir_csv, filas_sinteticas
+
+
+@pytest.mark.parametrize("por_mes", [False, True])
+def test_claves_de_particion_nulas(tmp_path, monkeypatch, por_mes):
+    rng = np.random.default_rng(3)
+    df = filas_sinteticas(
+        rng, [f"RAD{i:06d}" for i in range(200)], [f"NC{i:06d}" for i in range(200)],
+        [2023, 2024] * 100, date(2024, 12, 31), final=True,
+    )
+    df["AnoHecho"] = df["AnoHecho"].astype("Int16")
+    df["MesVersion"] = df["MesVersion"].astype("Int8")
+    df.loc[df.index[:3], "AnoHecho"] = None
+    df.loc[df.index[3:5], "MesVersion"] = None
+
+    csv = tmp_path / "MLrefinado.csv"
+    parquet = tmp_path / "MLrefinado.parquet"
+    escribir_csv(df, csv)
+    convertir_parquet.convertir(csv, parquet, por_mes=por_mes)
+    assert (parquet / "AnoHecho=__HIVE_DEFAULT_PARTITION__").is_dir()
+
+    monkeypatch.setattr(data_store, "CSV_PATH", csv)
+    monkeypatch.setattr(data_store, "PARQUET_PATH", parquet)
+    cargado, archivo = data_store.cargar_dataset()
+
+    assert archivo == parquet
+    assert len(cargado) == len(df)
+    assert cargado["AnoHecho"].isna().sum() == 3
+    assert cargado["MesVersion"].isna().sum() == 2
+    assert str(cargado["AnoHecho"].dtype) == "Int16"
@@ -0,0 +1,147 @@
+# Ingesta incremental (data_store.aplicar_delta) frente a una recarga completa
+# del mismo dataset: mismos cubos, mismo índice y mismos conteos de distintos.
+
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+pytest.importorskip("polars")
+
+import convertir_parquet
+import data_store
+import ingesta
+from cubo import DIMENSIONES, FILAS, REGISTROS
+from distintos import contar_distintos
+
+DEPARTAMENTOS = {"Antioquia": ["Medellín", "Bello"], "Nariño": ["Pasto"], "Bogotá D.C.": ["Bogotá D.C."]}
+
+
+def filas_sinteticas(rng, radicados, noticias, anios, fecha_version, final):
+    filas = []
+    for radicado, noticia, anio in zip(radicados, noticias, anios):
+        hecho = date(int(anio), 1, 1) + timedelta(days=int(rng.integers(0, 365)))
+        departamento = rng.choice(list(DEPARTAMENTOS))
+        filas.append({
+            "NoticiaCriminal": noticia,
+            "NumeroRadicadoInforme": radicado,
+            "FechaHecho": hecho.isoformat(),
+            "AnoHecho": hecho.year,
+            "MesHecho": hecho.month,
+            "DiaOcurrencia": "LUNES",
+            "Rango3horas": rng.choice(["00:00 - 02:59", "03:00 - 05:59"]),
+            "Departamento": departamento,
+            "Municipio": rng.choice(DEPARTAMENTOS[departamento]),
+            "Zona": rng.choice(["Urbana", "Rural"]),
+            "EstadoVictima": rng.choice(["Muertos", "Lesionados"]),
+            "ActorVial": rng.choice(["PEATÓN", "CONDUCTOR", "Peatón"]),
+            "TipoVehiculo": rng.choice(["MOTOCICLETA", "AUTOMÓVIL"]),
+            "Sexo": rng.choice(["M", "F"]),
+            "RangoEdad": rng.choice(["18-28", "29-39"]),
+            "ClaseAccidente": rng.choice(["CHOQUE", "ATROPELLO"]),
+            "ObjetoColision": "VEHÍCULO",
+            "Hipotesis": "IMPRUDENCIA",
+            "CausaMuerte": "TRAUMA",
+            "FechaVersion": fecha_version.isoformat(),
+            "MesVersion": fecha_version.month,
+            "EsVersionFinal": int(final),
+            "VersionFinalActual": int(final),
+        })
+    return pd.DataFrame(filas)
+
+
+def escribir_csv(df, ruta):
+    df.to_csv(ruta, sep=";", index=False, encoding="latin-1")
+
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    rng = np.random.default_rng(7)
+    n = 3000
+    # Varias víctimas por radicado y varios radicados por noticia
+    radicados = np.array([f"RAD{i:06d}" for i in rng.integers(0, n // 2, n)])
+    noticias = np.array([f"NC{int(r[3:]) // 3:06d}" for r in radicados], dtype=object)
+    noticias[rng.random(n) < 0.05] = None
+    anios = np.array([2022 + int(r[3:]) % 3 for r in radicados])
+    base = filas_sinteticas(rng, radicados, noticias, anios, date(2024, 12, 31), final=True)
+    # El mismo radicado conserva AnoHecho en todas sus filas
+    base["AnoHecho"] = anios
+    preliminares = filas_sinteticas(
+        rng, [f"PRE{i:06d}" for i in range(300)], [f"NCP{i // 2:06d}" for i in range(300)],
+        [2025] * 300, date(2025, 6, 28), final=False,
+    )
+    base = pd.concat([base, preliminares], ignore_index=True)
+
+    csv = tmp_path / "MLrefinado.csv"
+    parquet = tmp_path / "MLrefinado.parquet"
+    escribir_csv(base, csv)
+    convertir_parquet.convertir(csv, parquet)
+    monkeypatch.setattr(data_store, "CSV_PATH", csv)
+    monkeypatch.setattr(data_store, "PARQUET_PATH", parquet)
+
+    # Delta: versiones nuevas de radicados cargados (noticias ya vistas),
+    # radicados nuevos con noticias ya cargadas en otros años y noticias nuevas
+    existentes = base.drop_duplicates("NumeroRadicadoInforme").sample(200, random_state=1)
+    revisadas = filas_sinteticas(
+        rng, existentes["NumeroRadicadoInforme"], existentes["NoticiaCriminal"],
+        existentes["AnoHecho"], date(2025, 7, 31), final=True,
+    )
+    revisadas["AnoHecho"] = existentes["AnoHecho"].to_numpy()
+    cantidad = 150
+    nuevas = filas_sinteticas(
+        rng,
+        [f"NEW{i:06d}" for i in range(cantidad)],
+        [f"NC{i:06d}" if i % 2 else f"NCN{i:06d}" for i in range(cantidad)],
+        [2025] * cantidad, date(2025, 7, 31), final=False,
+    )
+    nuevas.loc[nuevas.index[:5], "NoticiaCriminal"] = None
+    delta = tmp_path / "delta.csv"
+    escribir_csv(pd.concat([revisadas, nuevas], ignore_index=True), delta)
+    return parquet, delta
+
+
+def cubo_ordenado(cubo):
+    dims = [c for c in DIMENSIONES if c in cubo.columns]
+    cubo = cubo[cubo[FILAS] != 0].astype({c: "object" for c in dims})
+    return cubo.sort_values(dims, na_position="last").reset_index(drop=True)[dims + [FILAS, REGISTROS]]
+
+
+def filas_indexadas(datos, posiciones):
+    """Las posiciones cambian entre cargas: se comparan las filas que señalan."""
+    filas = datos.vigente.take(posiciones)[["NumeroRadicadoInforme", "FechaVersion", "EstadoVictima"]]
+    return sorted(map(tuple, filas.astype(str).to_numpy()))
+
+
+def test_ingesta_igual_a_recarga_completa(dataset):
+    parquet, delta = dataset
+    base = data_store.construir_datos()
+
+    ingesta.agregar_particion(delta, parquet)
+    incremental = data_store.aplicar_delta(base, data_store.leer_csv(delta))
+    completa = data_store.construir_datos()
+
+    assert len(incremental.vigente) == len(completa.vigente)
+    for atributo in ("cubo_final", "cubo_preliminar"):
+        pd.testing.assert_frame_equal(
+            cubo_ordenado(getattr(incremental, atributo)), cubo_ordenado(getattr(completa, atributo)),
+            check_dtype=False,
+        )
+
+    assert incremental.indice.keys() == completa.indice.keys()
+    for columna, postings in completa.indice.items():
+        assert incremental.indice[columna].keys() == postings.keys()
+        for k, posiciones in postings.items():
+            assert filas_indexadas(incremental, incremental.indice[columna][k]) == \
+                filas_indexadas(completa, posiciones), (columna, k)
+
+    for ids in ("IdRadicado", "IdNoticia"):
+        for vista in ("vigente", "final", "preliminar"):
+            assert contar_distintos(getattr(incremental, vista), ids=ids) == \
+                contar_distintos(getattr(completa, vista), ids=ids), (ids, vista)
+        pd.testing.assert_series_equal(
+            contar_distintos(incremental.final, "Departamento", ids=ids).sort_index(),
+            contar_distintos(completa.final, "Departamento", ids=ids).sort_index(),
+            check_dtype=False, check_categorical=False,
+        )